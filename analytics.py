@@ -1,24 +1,81 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
-from typing import Dict
+from sqlalchemy import func, case, cast, literal_column, type_coerce, Float, Integer
+from typing import Dict, Optional, Sequence
+from datetime import date
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+import contextvars
 import json
 import csv
 import os
-from decimal import Decimal
+import time
 
 from config import Config
-from database import DailyData, HourlyData
+from database import DailyData, HourlyData, DistributionSketch, open_session
+from profiling import profile_thread
+
+
+# MySQL returns AVG and SUM as DECIMAL. Multiplying by the DOUBLE literal 1e0 makes AVG a DOUBLE
+# on every MySQL and MariaDB version (SQLAlchemy drops CAST(... AS DOUBLE) before MySQL 8.0.17),
+# so rows arrive as plain floats and ints.
+def _avg(column):
+    return type_coerce(func.avg(column) * literal_column("1e0"), Float)
+
+
+def _sum(column):
+    return cast(func.sum(column), Integer)
+
+
+SEASON_NAMES = {1: 'Winter', 2: 'Spring', 3: 'Summer', 4: 'Fall'}
+
+WEATHER_DESCRIPTIONS = {
+    1: 'Clear/Partly Cloudy',
+    2: 'Misty/Cloudy',
+    3: 'Light Rain/Snow',
+    4: 'Heavy Rain/Snow'
+}
+
+
+class AnalyticsFilters:
+    """Optional row filters pushed down into the WHERE clause of every analytics query."""
+
+    def __init__(self, start_date: Optional[date] = None, end_date: Optional[date] = None,
+                 year: Optional[int] = None, season: Optional[int] = None,
+                 workingday: Optional[int] = None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.year = year  # 0 (2011) or 1 (2012)
+        self.season = season  # 1-4
+        self.workingday = workingday  # 0 or 1
+
+    def apply(self, query, model):
+        if self.start_date is not None:
+            query = query.filter(model.dteday >= self.start_date)
+        if self.end_date is not None:
+            query = query.filter(model.dteday <= self.end_date)
+        if self.year is not None:
+            query = query.filter(model.yr == self.year)
+        if self.season is not None:
+            query = query.filter(model.season == self.season)
+        if self.workingday is not None:
+            query = query.filter(model.workingday == self.workingday)
+        return query
 
 
 class BikeSharingAnalytics:
 
     def __init__(self):
         self.analytics_dir = Config.ANALYTICS_PATH
-        if not os.path.exists(Config.ANALYTICS_PATH):
-            os.makedirs(Config.ANALYTICS_PATH)
+
+    def _ensure_analytics_dir(self):
+        os.makedirs(self.analytics_dir, exist_ok=True)
+
+    @staticmethod
+    def _filter(query, model, filters: Optional[AnalyticsFilters]):
+        return filters.apply(query, model) if filters is not None else query
 
     def _save_to_csv(self, data: Dict, filename: str):
         try:
+            self._ensure_analytics_dir()
             filepath = os.path.join(self.analytics_dir, f"{filename}.csv")
 
             if not data:
@@ -44,290 +101,438 @@ class BikeSharingAnalytics:
         except Exception as e:
             print(f"Error saving {filename} to CSV: {e}")
 
-    def get_basic_statistics(self, db: Session, save_csv: bool = False) -> Dict:
-        try:
-            daily_stats = db.query(
-                func.count(DailyData.instant).label('total_days'),  # number of days
-                func.avg(DailyData.cnt).label('avg_daily_rentals'),  # avg rentals
-                func.max(DailyData.cnt).label('max_daily_rentals'),  # max num of rentals
-                func.min(DailyData.cnt).label('min_daily_rentals'),  # min num of rentals
-            ).first()
-
-            hourly_stats = db.query(
-                func.count(HourlyData.instant).label('total_hours'),  # number of hours
-                func.avg(HourlyData.cnt).label('avg_hourly_rentals'),  # avg rentals /per hour
-                func.max(HourlyData.cnt).label('max_hourly_rentals'),  # max num of rentals
-                func.min(HourlyData.cnt).label('min_hourly_rentals')  # min num of rentals
-            ).first()
-
-            result = {
-                'daily': {
-                    'total_days': daily_stats.total_days or 0,
-                    'avg_daily_rentals': round(daily_stats.avg_daily_rentals or 0, 2),
-                    'max_daily_rentals': daily_stats.max_daily_rentals or 0,
-                    'min_daily_rentals': daily_stats.min_daily_rentals or 0,
-                },
-                'hourly': {
-                    'total_hours': hourly_stats.total_hours or 0,
-                    'avg_hourly_rentals': round(hourly_stats.avg_hourly_rentals or 0, 2),
-                    'max_hourly_rentals': hourly_stats.max_hourly_rentals or 0,
-                    'min_hourly_rentals': hourly_stats.min_hourly_rentals or 0
-                }
+    def get_basic_statistics(self, db: Session, save_csv: bool = False,
+                             filters: Optional[AnalyticsFilters] = None) -> Dict:
+        daily_stats = db.query(
+            func.count(DailyData.instant).label('total_days'),  # number of days
+            _avg(DailyData.cnt).label('avg_daily_rentals'),  # avg rentals
+            func.max(DailyData.cnt).label('max_daily_rentals'),  # max num of rentals
+            func.min(DailyData.cnt).label('min_daily_rentals'),  # min num of rentals
+        )
+        daily_stats = self._filter(daily_stats, DailyData, filters).first()
+
+        hourly_stats = db.query(
+            func.count(HourlyData.instant).label('total_hours'),  # number of hours
+            _avg(HourlyData.cnt).label('avg_hourly_rentals'),  # avg rentals /per hour
+            func.max(HourlyData.cnt).label('max_hourly_rentals'),  # max num of rentals
+            func.min(HourlyData.cnt).label('min_hourly_rentals')  # min num of rentals
+        )
+        hourly_stats = self._filter(hourly_stats, HourlyData, filters).first()
+
+        result = {
+            'daily': {
+                'total_days': daily_stats.total_days or 0,
+                'avg_daily_rentals': round(daily_stats.avg_daily_rentals or 0, 2),
+                'max_daily_rentals': daily_stats.max_daily_rentals or 0,
+                'min_daily_rentals': daily_stats.min_daily_rentals or 0,
+            },
+            'hourly': {
+                'total_hours': hourly_stats.total_hours or 0,
+                'avg_hourly_rentals': round(hourly_stats.avg_hourly_rentals or 0, 2),
+                'max_hourly_rentals': hourly_stats.max_hourly_rentals or 0,
+                'min_hourly_rentals': hourly_stats.min_hourly_rentals or 0
             }
+        }
 
-            if save_csv:
-                self._save_to_csv(result, 'basic_statistics')
-
-            return result
-        except Exception as e:
-            print(f"Error getting basic statistics: {e}")
-            return {}
-
-    def get_seasonal_statistics(self, db: Session, save_csv: bool = False) -> Dict:
-        try:
-            seasonal_stats = db.query(
-                DailyData.season,
-                func.avg(DailyData.cnt).label('avg_rentals'),
-                func.sum(DailyData.cnt).label('total_rentals'),
-                func.count(DailyData.instant).label('days_count')
-            ).group_by(DailyData.season).all()
-
-            season_names = {1: 'Winter', 2: 'Spring', 3: 'Summer', 4: 'Fall'}
-
-            result = {}
-            for stat in seasonal_stats:
-                season_name = season_names.get(stat.season, f'Season {stat.season}')
-                result[season_name] = {
-                    'avg_rentals': round(stat.avg_rentals, 2),
-                    'total_rentals': stat.total_rentals,
-                    'days_count': stat.days_count
-                }
+        if save_csv:
+            self._save_to_csv(result, 'basic_statistics')
+
+        return result
+
+    def get_seasonal_statistics(self, db: Session, save_csv: bool = False,
+                                filters: Optional[AnalyticsFilters] = None) -> Dict:
+        seasonal_stats = db.query(
+            DailyData.season,
+            _avg(DailyData.cnt).label('avg_rentals'),
+            _sum(DailyData.cnt).label('total_rentals'),
+            func.count(DailyData.instant).label('days_count')
+        )
+        seasonal_stats = self._filter(seasonal_stats, DailyData, filters).group_by(DailyData.season).all()
+
+        result = {}
+        for stat in seasonal_stats:
+            season_name = SEASON_NAMES.get(stat.season, f'Season {stat.season}')
+            result[season_name] = {
+                'avg_rentals': round(stat.avg_rentals, 2),
+                'total_rentals': stat.total_rentals,
+                'days_count': stat.days_count
+            }
 
-            if save_csv:
-                self._save_to_csv(result, 'seasonal_statistics')
+        if save_csv:
+            self._save_to_csv(result, 'seasonal_statistics')
+
+        return result
+
+    def get_hourly_statistics(self, db: Session, save_csv: bool = False,
+                              filters: Optional[AnalyticsFilters] = None) -> Dict:
+        hourly_stats = db.query(
+            HourlyData.hr,
+            _avg(HourlyData.cnt).label('avg_rentals'),
+            _sum(HourlyData.cnt).label('total_rentals'),
+            func.count(HourlyData.instant).label('hours_count')
+        )
+        hourly_stats = self._filter(hourly_stats, HourlyData, filters).group_by(HourlyData.hr).order_by(HourlyData.hr).all()
+
+        result = {}
+        for stat in hourly_stats:
+            result[f'hour_{stat.hr}'] = {
+                'avg_total_rentals': round(stat.avg_rentals, 2),
+                'total_rentals': stat.total_rentals,
+                'days_count': stat.hours_count,
+            }
 
-            return result
-        except Exception as e:
-            print(f"Error getting seasonal statistics: {e}")
-            return {}
+        if save_csv:
+            self._save_to_csv(result, 'hourly_statistics')
+
+        return result
+
+    def get_weather_impact(self, db: Session, save_csv: bool = False,
+                           filters: Optional[AnalyticsFilters] = None) -> Dict:
+        weather_stats = db.query(
+            DailyData.weathersit,
+            _avg(DailyData.cnt).label('avg_rentals'),
+            func.count(DailyData.instant).label('days_count')
+        )
+        weather_stats = self._filter(weather_stats, DailyData, filters).group_by(DailyData.weathersit).all()
+
+        result = {}
+        for stat in weather_stats:
+            weather_desc = WEATHER_DESCRIPTIONS.get(stat.weathersit, f'Weather {stat.weathersit}')
+            result[weather_desc] = {
+                'avg_rentals': round(stat.avg_rentals, 2),
+                'days_count': stat.days_count
+            }
 
-    def get_hourly_statistics(self, db: Session, save_csv: bool = False) -> Dict:
-        try:
-            hourly_stats = db.query(
-                HourlyData.hr,
-                func.avg(HourlyData.cnt).label('avg_rentals'),
-                func.sum(HourlyData.cnt).label('total_rentals'),
-                func.count(HourlyData.instant).label('hours_count')
-            ).group_by(HourlyData.hr).order_by(HourlyData.hr).all()
+        if save_csv:
+            self._save_to_csv(result, 'weather_impact')
 
-            result = {}
-            for stat in hourly_stats:
-                result[f'hour_{stat.hr}'] = {
-                    'avg_total_rentals': round(stat.avg_rentals, 2),
-                    'total_rentals': stat.total_rentals,
-                    'days_count': stat.hours_count,
-                }
+        return result
 
-            if save_csv:
-                self._save_to_csv(result, 'hourly_statistics')
+    def get_monthly_trends(self, db: Session, save_csv: bool = False,
+                           filters: Optional[AnalyticsFilters] = None) -> Dict:
+        monthly_stats = db.query(
+            DailyData.mnth,
+            _avg(DailyData.cnt).label('avg_rentals'),
+            _sum(DailyData.cnt).label('total_rentals')
+        )
+        monthly_stats = self._filter(monthly_stats, DailyData, filters).group_by(DailyData.mnth).order_by(DailyData.mnth).all()
 
-            return result
-        except Exception as e:
-            print(f"Error getting hourly patterns: {e}")
-            return {}
+        month_names = {
+            1: 'January', 2: 'February', 3: 'March', 4: 'April',
+            5: 'May', 6: 'June', 7: 'July', 8: 'August',
+            9: 'September', 10: 'October', 11: 'November', 12: 'December'
+        }
 
-    def get_weather_impact(self, db: Session, save_csv: bool = False) -> Dict:
-        try:
-            weather_stats = db.query(
-                DailyData.weathersit,
-                func.avg(DailyData.cnt).label('avg_rentals'),
-                func.count(DailyData.instant).label('days_count')
-            ).group_by(DailyData.weathersit).all()
-
-            weather_descriptions = {
-                1: 'Clear/Partly Cloudy',
-                2: 'Misty/Cloudy',
-                3: 'Light Rain/Snow',
-                4: 'Heavy Rain/Snow'
+        result = {}
+        for stat in monthly_stats:
+            month_name = month_names.get(stat.mnth, f'Month {stat.mnth}')
+            result[month_name] = {
+                'avg_rentals': round(stat.avg_rentals, 2),
+                'total_rentals': stat.total_rentals
             }
 
-            result = {}
-            for stat in weather_stats:
-                weather_desc = weather_descriptions.get(stat.weathersit, f'Weather {stat.weathersit}')
-                result[weather_desc] = {
-                    'avg_rentals': round(stat.avg_rentals, 2),
-                    'days_count': stat.days_count
-                }
+        if save_csv:
+            self._save_to_csv(result, 'monthly_trends')
 
-            if save_csv:
-                self._save_to_csv(result, 'weather_impact')
+        return result
 
-            return result
-        except Exception as e:
-            print(f"Error getting weather impact: {e}")
-            return {}
+    def get_weekday_patterns(self, db: Session, save_csv: bool = False,
+                             filters: Optional[AnalyticsFilters] = None) -> Dict:
+        weekday_stats = db.query(
+            DailyData.weekday,
+            _avg(DailyData.cnt).label('avg_rentals'),
+            _avg(DailyData.casual).label('avg_casual'),
+            _avg(DailyData.registered).label('avg_registered')
+        )
+        weekday_stats = self._filter(weekday_stats, DailyData, filters).group_by(DailyData.weekday).order_by(DailyData.weekday).all()
 
-    def get_monthly_trends(self, db: Session, save_csv: bool = False) -> Dict:
-        try:
-            monthly_stats = db.query(
-                DailyData.mnth,
-                func.avg(DailyData.cnt).label('avg_rentals'),
-                func.sum(DailyData.cnt).label('total_rentals')
-            ).group_by(DailyData.mnth).order_by(DailyData.mnth).all()
-
-            month_names = {
-                1: 'January', 2: 'February', 3: 'March', 4: 'April',
-                5: 'May', 6: 'June', 7: 'July', 8: 'August',
-                9: 'September', 10: 'October', 11: 'November', 12: 'December'
+        weekday_names = {
+            0: 'Sunday', 1: 'Monday', 2: 'Tuesday', 3: 'Wednesday',
+            4: 'Thursday', 5: 'Friday', 6: 'Saturday'
+        }
+
+        result = {}
+        for stat in weekday_stats:
+            day_name = weekday_names.get(stat.weekday, f'Day {stat.weekday}')
+            result[day_name] = {
+                'avg_total_rentals': round(stat.avg_rentals, 2),
+                'avg_casual_rentals': round(stat.avg_casual, 2),
+                'avg_registered_rentals': round(stat.avg_registered, 2)
             }
 
-            result = {}
-            for stat in monthly_stats:
-                month_name = month_names.get(stat.mnth, f'Month {stat.mnth}')
-                result[month_name] = {
-                    'avg_rentals': round(stat.avg_rentals, 2),
-                    'total_rentals': stat.total_rentals
-                }
+        if save_csv:
+            self._save_to_csv(result, 'weekday_patterns')
+
+        return result
+
+    def get_temperature_analysis(self, db: Session, save_csv: bool = False,
+                                 filters: Optional[AnalyticsFilters] = None) -> Dict:
+        temp_ranges = db.query(
+            DailyData.temp,
+            DailyData.cnt,
+            case(
+                (DailyData.temp < 0.3, 'Cold'),
+                (DailyData.temp < 0.6, 'Moderate'),
+                (DailyData.temp < 0.8, 'Warm'),
+                else_='Hot'
+            ).label('temp_range')
+        )
+        temp_ranges = self._filter(temp_ranges, DailyData, filters).subquery()
+
+        temp_stats = db.query(
+            temp_ranges.c.temp_range,  # .c = columns of subquery -> .c.temp_range
+            _avg(temp_ranges.c.cnt).label('avg_rentals'),
+            func.count(temp_ranges.c.temp_range).label('days_count')
+        ).group_by(temp_ranges.c.temp_range).all()
+
+        result = {}
+        for stat in temp_stats:
+            result[stat.temp_range] = {
+                'avg_rentals': round(stat.avg_rentals, 2),
+                'days_count': stat.days_count
+            }
 
-            if save_csv:
-                self._save_to_csv(result, 'monthly_trends')
+        if save_csv:
+            self._save_to_csv(result, 'temperature_analysis')
+
+        return result
+
+    def get_user_type_analysis(self, db: Session, save_csv: bool = False,
+                               filters: Optional[AnalyticsFilters] = None) -> Dict:
+        daily_user_stats = db.query(
+            _avg(DailyData.casual).label('avg_casual'),
+            _avg(DailyData.registered).label('avg_registered'),
+            _sum(DailyData.casual).label('total_casual'),
+            _sum(DailyData.registered).label('total_registered')
+        )
+        daily_user_stats = self._filter(daily_user_stats, DailyData, filters).first()
+
+        hourly_user_stats = db.query(
+            _avg(HourlyData.casual).label('avg_casual'),
+            _avg(HourlyData.registered).label('avg_registered'),
+            _sum(HourlyData.casual).label('total_casual'),
+            _sum(HourlyData.registered).label('total_registered')
+        )
+        hourly_user_stats = self._filter(hourly_user_stats, HourlyData, filters).first()
+
+        result = {
+            'daily': {
+                'avg_casual': round(daily_user_stats.avg_casual or 0, 2),
+                'avg_registered': round(daily_user_stats.avg_registered or 0, 2),
+                'total_casual': daily_user_stats.total_casual or 0,
+                'total_registered': daily_user_stats.total_registered or 0,
+            },
+            'hourly': {
+                'avg_casual': round(hourly_user_stats.avg_casual or 0, 2),
+                'avg_registered': round(hourly_user_stats.avg_registered or 0, 2),
+                'total_casual': hourly_user_stats.total_casual or 0,
+                'total_registered': hourly_user_stats.total_registered or 0,
+            }
+        }
 
-            return result
-        except Exception as e:
-            print(f"Error getting monthly trends: {e}")
-            return {}
+        if save_csv:
+            self._save_to_csv(result, 'user_type_analysis')
+
+        return result
+
+    @staticmethod
+    def _distribution_label(dimension: str, value) -> str:
+        if dimension == 'hr':
+            return f'hour_{value}'
+        if dimension == 'season':
+            return SEASON_NAMES.get(value, f'Season {value}')
+        if dimension == 'weathersit':
+            return WEATHER_DESCRIPTIONS.get(value, f'Weather {value}')
+        return 'all'
+
+    def get_distribution_analysis(self, db: Session, dimension: str = 'hr',
+                                  quantiles: Sequence[float] = (0.5, 0.9, 0.99),
+                                  mode: str = 'auto') -> Dict:
+        """Percentiles and histograms of hourly `cnt` grouped by hr, season, weathersit or 'all'.
+
+        In 'sketch' mode the t-digests and histograms built at ingestion time for every
+        (hr, season, weathersit) bucket are merged per group, so no rows are read or sorted.
+        'exact' mode computes percentiles from the raw rows; 'auto' uses it for tables of up
+        to SKETCH_EXACT_MAX_ROWS rows and whenever no sketches have been built.
+        """
+        import numpy as np
+        from sketches import TDigest, FixedWidthHistogram
 
-    def get_weekday_patterns(self, db: Session, save_csv: bool = False) -> Dict:
         try:
-            weekday_stats = db.query(
-                DailyData.weekday,
-                func.avg(DailyData.cnt).label('avg_rentals'),
-                func.avg(DailyData.casual).label('avg_casual'),
-                func.avg(DailyData.registered).label('avg_registered')
-            ).group_by(DailyData.weekday).order_by(DailyData.weekday).all()
-
-            weekday_names = {
-                0: 'Sunday', 1: 'Monday', 2: 'Tuesday', 3: 'Wednesday',
-                4: 'Thursday', 5: 'Friday', 6: 'Saturday'
-            }
+            if mode == 'auto':
+                total_rows = db.query(func.count(HourlyData.instant)).scalar() or 0
+                mode = 'exact' if total_rows <= Config.SKETCH_EXACT_MAX_ROWS else 'sketch'
+
+            sketches = db.query(DistributionSketch).all() if mode == 'sketch' else []
+            if mode == 'sketch' and not sketches:
+                print("No distribution sketches found, falling back to exact percentiles")
+                mode = 'exact'
+
+            digests = {}
+            histograms = {}
+            if mode == 'sketch':
+                for sketch in sketches:
+                    key = getattr(sketch, dimension) if dimension != 'all' else None
+                    digest = TDigest.from_dict(json.loads(sketch.digest))
+                    histogram = FixedWidthHistogram.from_dict(json.loads(sketch.histogram))
+                    if key in digests:
+                        digests[key].merge(digest)
+                        histograms[key].merge(histogram)
+                    else:
+                        digests[key] = digest
+                        histograms[key] = histogram
+                groups = {key: (digest.count, digest.quantile(quantiles)) for key, digest in digests.items()}
+            else:
+                key_column = getattr(HourlyData, dimension) if dimension != 'all' else None
+                query = db.query(key_column, HourlyData.cnt) if key_column is not None else db.query(HourlyData.cnt)
+                values = {}
+                for row in query.all():
+                    key = row[0] if key_column is not None else None
+                    values.setdefault(key, []).append(row[-1])
+                groups = {}
+                for key, group_values in values.items():
+                    group_values = np.asarray(group_values, dtype=float)
+                    groups[key] = (len(group_values), np.quantile(group_values, quantiles))
+                    histograms[key] = FixedWidthHistogram.from_values(group_values, Config.SKETCH_HISTOGRAM_BIN_WIDTH)
 
             result = {}
-            for stat in weekday_stats:
-                day_name = weekday_names.get(stat.weekday, f'Day {stat.weekday}')
-                result[day_name] = {
-                    'avg_total_rentals': round(stat.avg_rentals, 2),
-                    'avg_casual_rentals': round(stat.avg_casual, 2),
-                    'avg_registered_rentals': round(stat.avg_registered, 2)
-                }
-
-            if save_csv:
-                self._save_to_csv(result, 'weekday_patterns')
-
-            return result
+            for key in sorted(groups, key=lambda value: (value is None, value)):
+                count, percentiles = groups[key]
+                entry = {'count': int(count)}
+                for q, value in zip(quantiles, percentiles):
+                    entry[f'p{q * 100:g}'] = round(float(value), 2)
+                entry['histogram'] = histograms[key].bins()
+                result[self._distribution_label(dimension, key)] = entry
+
+            return {
+                'mode': mode,
+                'dimension': dimension,
+                'distribution': result
+            }
         except Exception as e:
-            print(f"Error getting weekday patterns: {e}")
+            print(f"Error getting distribution analysis: {e}")
             return {}
 
-    def get_temperature_analysis(self, db: Session, save_csv: bool = False) -> Dict:
+    # Result key -> section method; the sections are independent read-only aggregates
+    SECTIONS = {
+        'basic_statistics': 'get_basic_statistics',
+        'seasonal_analysis': 'get_seasonal_statistics',
+        'hourly_patterns': 'get_hourly_statistics',
+        'weather_impact': 'get_weather_impact',
+        'monthly_trends': 'get_monthly_trends',
+        'weekday_patterns': 'get_weekday_patterns',
+        'temperature_analysis': 'get_temperature_analysis',
+        'user_type_analysis': 'get_user_type_analysis',
+    }
+
+    def _run_section(self, section: str, save_csv: bool, filters: Optional[AnalyticsFilters],
+                     started: Future) -> Dict:
+        # A section's timeout runs from here, not from submission, so time spent queued is not counted
+        started.set_result(time.monotonic())
+        # Sessions are not thread-safe, so every section checks out its own pooled connection
+        db = open_session()
         try:
-            temp_ranges = db.query(
-                DailyData.temp,
-                DailyData.cnt,
-                case(
-                    (DailyData.temp < 0.3, 'Cold'),
-                    (DailyData.temp < 0.6, 'Moderate'),
-                    (DailyData.temp < 0.8, 'Warm'),
-                    else_='Hot'
-                ).label('temp_range')
-            ).subquery()
-
-            temp_stats = db.query(
-                temp_ranges.c.temp_range,  # .c = columns of subquery -> .c.temp_range
-                func.avg(temp_ranges.c.cnt).label('avg_rentals'),
-                func.count(temp_ranges.c.temp_range).label('days_count')
-            ).group_by(temp_ranges.c.temp_range).all()
-
-            result = {}
-            for stat in temp_stats:
-                result[stat.temp_range] = {
-                    'avg_rentals': round(stat.avg_rentals, 2),
-                    'days_count': stat.days_count
-                }
-
-            if save_csv:
-                self._save_to_csv(result, 'temperature_analysis')
-
-            return result
+            with profile_thread():
+                return getattr(self, self.SECTIONS[section])(db, save_csv, filters)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _degraded(section: str, reason: str) -> Dict:
+        print(f"Error getting {section.replace('_', ' ')}: {reason}")
+        return {'degraded': True, 'reason': reason}
+
+    def _submit(self, executor: ThreadPoolExecutor, section: str, save_csv: bool,
+                filters: Optional[AnalyticsFilters], started: Future) -> Future:
+        # The task runs in a copy of the caller's context, so it counts towards the request metrics and profile
+        return executor.submit(
+            contextvars.copy_context().run, self._run_section, section, save_csv, filters, started
+        )
+
+    def _collect(self, section: str, future: Future) -> Dict:
+        try:
+            return future.result(timeout=0)
         except Exception as e:
-            print(f"Error getting temperature analysis: {e}")
-            return {}
+            return self._degraded(section, str(e))
+
+    def get_analytics(self, db: Session, save_csv_options: bool = False,
+                      filters: Optional[AnalyticsFilters] = None,
+                      max_parallel: int = Config.ANALYTICS_MAX_PARALLEL,
+                      section_timeout: float = Config.ANALYTICS_SECTION_TIMEOUT) -> Dict:
+        """Runs every analytics section, up to `max_parallel` at a time on separate sessions.
+
+        A section that raises, or is still running `section_timeout` seconds after it started, is
+        returned as {'degraded': True, 'reason': ...} while the other sections keep their results.
+        Sections still queued once every section could have had its turn (ceil(sections /
+        max_parallel) timeouts) are reported as not started. With max_parallel <= 1 the sections
+        run one after another. `db` is not used by the sections, which always check out their
+        own sessions.
+        """
+        result = {}
+        # Resolved with the start time by each section's worker, so the waits below also wake on starts
+        started = {section: Future() for section in self.SECTIONS}
+        timed_out = f"timed out after {section_timeout:g}s"
+
+        if max_parallel <= 1:
+            for section in self.SECTIONS:
+                # A fresh worker per section, so one that timed out does not hold up the next
+                executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analytics')
+                try:
+                    future = self._submit(executor, section, save_csv_options, filters, started[section])
+                    wait([future], timeout=section_timeout)
+                    if future.done():
+                        result[section] = self._collect(section, future)
+                    else:
+                        result[section] = self._degraded(section, timed_out)
+                finally:
+                    executor.shutdown(wait=False)
+            return result
 
-    def get_user_type_analysis(self, db: Session, save_csv: bool = False) -> Dict:
+        executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix='analytics')
         try:
-            daily_user_stats = db.query(
-                func.avg(DailyData.casual).label('avg_casual'),
-                func.avg(DailyData.registered).label('avg_registered'),
-                func.sum(DailyData.casual).label('total_casual'),
-                func.sum(DailyData.registered).label('total_registered')
-            ).first()
-
-            hourly_user_stats = db.query(
-                func.avg(HourlyData.casual).label('avg_casual'),
-                func.avg(HourlyData.registered).label('avg_registered'),
-                func.sum(HourlyData.casual).label('total_casual'),
-                func.sum(HourlyData.registered).label('total_registered')
-            ).first()
-
-            result = {
-                'daily': {
-                    'avg_casual': round(daily_user_stats.avg_casual or 0, 2),
-                    'avg_registered': round(daily_user_stats.avg_registered or 0, 2),
-                    'total_casual': daily_user_stats.total_casual or 0,
-                    'total_registered': daily_user_stats.total_registered or 0,
-                },
-                'hourly': {
-                    'avg_casual': round(hourly_user_stats.avg_casual or 0, 2),
-                    'avg_registered': round(hourly_user_stats.avg_registered or 0, 2),
-                    'total_casual': hourly_user_stats.total_casual or 0,
-                    'total_registered': hourly_user_stats.total_registered or 0,
-                }
+            pending = {
+                section: self._submit(executor, section, save_csv_options, filters, started[section])
+                for section in self.SECTIONS
             }
-
-            if save_csv:
-                self._save_to_csv(result, 'user_type_analysis')
-
-            return result
-        except Exception as e:
-            print(f"Error getting user type analysis: {e}")
-            return {}
-
-    def get_analytics(self, db: Session, save_csv_options: bool = False) -> Dict:
-
-        return {
-            'basic_statistics': self.get_basic_statistics(db, save_csv_options),
-            'seasonal_analysis': self.get_seasonal_statistics(db, save_csv_options),
-            'hourly_patterns': self.get_hourly_statistics(db, save_csv_options),
-            'weather_impact': self.get_weather_impact(db, save_csv_options),
-            'monthly_trends': self.get_monthly_trends(db, save_csv_options),
-            'weekday_patterns': self.get_weekday_patterns(db, save_csv_options),
-            'temperature_analysis': self.get_temperature_analysis(db,save_csv_options),
-            'user_type_analysis': self.get_user_type_analysis(db, save_csv_options)
-        }
-
-    def convert_decimal_to_float(self, obj):
-        if isinstance(obj, Decimal):
-            return float(obj)
-        elif isinstance(obj, dict):
-            return {key: self.convert_decimal_to_float(value) for key, value in obj.items()}
-        else:
-            return obj
+            rounds = -(-len(pending) // max_parallel)
+            queue_deadline = time.monotonic() + rounds * section_timeout
+
+            while pending:
+                now = time.monotonic()
+                for section, future in list(pending.items()):
+                    start = started[section].result() if started[section].done() else None
+                    if future.done():
+                        result[section] = self._collect(section, future)
+                    elif start is not None and now - start >= section_timeout:
+                        result[section] = self._degraded(section, timed_out)
+                    elif start is None and now >= queue_deadline and future.cancel():
+                        # Workers are still busy with sections that timed out
+                        result[section] = self._degraded(section, "not started")
+                    else:
+                        continue
+                    del pending[section]
+                if not pending:
+                    break
+
+                # Sleep until a section starts or finishes, or the next timeout expires
+                deadlines = [queue_deadline] + [
+                    started[section].result() + section_timeout for section in pending if started[section].done()
+                ]
+                waiting_to_start = [started[section] for section in pending if not started[section].done()]
+                wait(list(pending.values()) + waiting_to_start,
+                     timeout=max(0.0, min(deadlines) - time.monotonic()), return_when=FIRST_COMPLETED)
+        finally:
+            # Do not block on sections that timed out; their threads close their sessions when done
+            executor.shutdown(wait=False)
+
+        # Sections were collected as they finished; return them in their usual order
+        return {section: result[section] for section in self.SECTIONS}
 
     def export_data(self, db: Session, save_csv_options: bool = True) -> Dict:
         try:
-            analytics_dict = self.convert_decimal_to_float(
-                self.get_analytics(db, save_csv_options)
-            )
+            analytics_dict = self.get_analytics(db, save_csv_options)
 
+            self._ensure_analytics_dir()
             file_path = os.path.join(Config.ANALYTICS_PATH, "analytics.json")
             with open(file_path, "w") as f:
                 json.dump(analytics_dict, f, indent=4)
@@ -1,19 +1,55 @@
-from typing import Optional
+import os
+from datetime import date, datetime
+from functools import lru_cache
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from config import Config
 from data_loader import DataLoader
 from database import get_db
-from analytics import BikeSharingAnalytics
+from analytics import AnalyticsFilters, BikeSharingAnalytics
 from models import BikeSharingPredictor
+from metrics import export_metrics
+from profiling import ProfiledRoute, request_profiler
+from startup import get_startup_report, recheck_database
+from serialization import columnar_response_format, encode_response, response_format
 
-router = APIRouter()
-data_loader = DataLoader()
-analytics = BikeSharingAnalytics()
-predictor = BikeSharingPredictor()
+# Sync endpoints run in the threadpool; ProfiledRoute keeps them visible to request profiling
+router = APIRouter(route_class=ProfiledRoute)
+
+
+# Services are created on first use so that importing the app stays cheap
+@lru_cache()
+def get_data_loader() -> DataLoader:
+    return DataLoader()
+
+
+@lru_cache()
+def get_analytics_service() -> BikeSharingAnalytics:
+    return BikeSharingAnalytics()
+
+
+@lru_cache()
+def get_predictor() -> BikeSharingPredictor:
+    return BikeSharingPredictor()
+
+
+@lru_cache()
+def get_backtest_engine():
+    from backtesting import BacktestEngine  # pulls in NumPy
+
+    return BacktestEngine()
+
+
+@lru_cache()
+def get_timeseries_service():
+    from timeseries import BikeSharingTimeSeries  # pulls in NumPy
+
+    return BikeSharingTimeSeries()
 
 
 class PredictionRequest(BaseModel):
@@ -31,6 +67,19 @@ class PredictionRequest(BaseModel):
     weathersit: int = 1  # 1-4
 
 
+class WeatherOutlook(BaseModel):
+    temp: float = 0.5
+    humidity: float = 0.5
+    windspeed: float = 0.2
+    weathersit: int = 1  # 1-4
+
+
+class ForecastRequest(BaseModel):
+    start: datetime
+    horizon_hours: int = Field(168, ge=1, le=14 * 24)
+    weather: List[WeatherOutlook] = []  # one entry per day, the last one is reused for remaining days
+
+
 @router.get("/")
 async def root():
     return {
@@ -39,19 +88,29 @@ async def root():
         "endpoints": {
             "load_data": "/load-data",
             "train_model": "/train-model",
+            "train_model_incremental": "/train-model/incremental",
+            "backtest": "/backtest",
             "predict": "/predict",
+            "forecast": "/forecast",
             "analytics": "/analytics",
-            "export": "/analytics/export/"
+            "export": "/analytics/export/",
+            "timeseries": "/analytics/timeseries",
+            "distribution": "/analytics/distribution",
+            "metrics": "/metrics",
+            "profiles": "/profiles",
+            "ready": "/ready"
         }
     }
 
 
 @router.post("/load-data")
-async def load_data(db: Session = Depends(get_db)):
+async def load_data(db: Session = Depends(get_db),
+                    data_loader: DataLoader = Depends(get_data_loader)):
     try:
         success = data_loader.load_to_database(db)
 
         if success:
+            get_timeseries_service().reset()
             return {
                 "message": "Data loaded successfully",
                 "status": "success"
@@ -64,15 +123,35 @@ async def load_data(db: Session = Depends(get_db)):
 
 
 @router.get("/analytics")
-async def get_analytics(db: Session = Depends(get_db)):
+def get_analytics(start_date: Optional[date] = None,
+                  end_date: Optional[date] = None,
+                  year: Optional[int] = Query(None, ge=0, le=1),
+                  season: Optional[int] = Query(None, ge=1, le=4),
+                  workingday: Optional[int] = Query(None, ge=0, le=1),
+                  db: Session = Depends(get_db),
+                  analytics: BikeSharingAnalytics = Depends(get_analytics_service),
+                  output_format: str = Depends(response_format)):
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+
+    filters = AnalyticsFilters(
+        start_date=start_date,
+        end_date=end_date,
+        year=year,
+        season=season,
+        workingday=workingday
+    )
+
     try:
-        result = analytics.get_analytics(db)
+        result = analytics.get_analytics(db, filters=filters)
+        degraded = [section for section, value in result.items() if value.get("degraded")]
 
-        if result:
-            return {
+        if result and len(degraded) < len(result):
+            return encode_response({
                 "analytics": result,
-                "status": "success"
-            }
+                "degraded": degraded,
+                "status": "partial" if degraded else "success"
+            }, output_format)
         else:
             raise HTTPException(status_code=500, detail="Failed to generate analytics")
 
@@ -81,15 +160,17 @@ async def get_analytics(db: Session = Depends(get_db)):
 
 
 @router.get("/analytics/export")
-async def get_analytics(db: Session = Depends(get_db)):
+def get_analytics(db: Session = Depends(get_db),
+                  analytics: BikeSharingAnalytics = Depends(get_analytics_service),
+                  output_format: str = Depends(response_format)):
     try:
         result = analytics.export_data(db)
 
         if result:
-            return {
+            return encode_response({
                 "analytics": result,
                 "status": "success"
-            }
+            }, output_format)
         else:
             raise HTTPException(status_code=500, detail="Failed to generate analytics")
 
@@ -97,8 +178,58 @@ async def get_analytics(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error exporting analytics: {str(e)}")
 
 
+@router.get("/analytics/timeseries")
+async def get_timeseries(start_date: Optional[date] = None,
+                         end_date: Optional[date] = None,
+                         db: Session = Depends(get_db),
+                         timeseries=Depends(get_timeseries_service),
+                         output_format: str = Depends(columnar_response_format)):
+    try:
+        result = timeseries.get_timeseries(db, start_date, end_date)
+
+        if result:
+            return encode_response({
+                "timeseries": result,
+                "status": "success"
+            }, output_format, columns=result["daily"])
+        else:
+            raise HTTPException(status_code=500, detail="Failed to generate time series analytics")
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating time series analytics: {str(e)}")
+
+
+@router.get("/analytics/distribution")
+async def get_distribution(dimension: Literal["hr", "season", "weathersit", "all"] = "hr",
+                           quantiles: str = "0.5,0.9,0.99",
+                           mode: Literal["auto", "sketch", "exact"] = "auto",
+                           db: Session = Depends(get_db),
+                           analytics: BikeSharingAnalytics = Depends(get_analytics_service),
+                           output_format: str = Depends(response_format)):
+    try:
+        quantile_values = [float(q) for q in quantiles.split(",")]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="quantiles must be a comma-separated list of numbers")
+    if not all(0 <= q <= 1 for q in quantile_values):
+        raise HTTPException(status_code=400, detail="quantiles must be between 0 and 1")
+
+    try:
+        result = analytics.get_distribution_analysis(db, dimension, quantile_values, mode)
+
+        if result:
+            return encode_response({
+                "analytics": result,
+                "status": "success"
+            }, output_format)
+        else:
+            raise HTTPException(status_code=500, detail="Failed to generate distribution analytics")
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating distribution analytics: {str(e)}")
+
+
 @router.post("/train-model")
-async def train_model(hourly: bool):
+async def train_model(hourly: bool, predictor: BikeSharingPredictor = Depends(get_predictor)):
     try:
         result = predictor.train_model(
             use_hourly=hourly
@@ -117,8 +248,65 @@ async def train_model(hourly: bool):
         raise HTTPException(status_code=500, detail=f"Error training model: {str(e)}")
 
 
+@router.post("/train-model/incremental")
+def train_model_incremental(hourly: bool = True,
+                            estimator: Literal["forest", "sgd"] = "forest",
+                            batch_size: int = Query(Config.TRAIN_BATCH_SIZE, ge=100),
+                            source: Literal["db", "snapshot"] = "db",
+                            resume: bool = False,
+                            predictor: BikeSharingPredictor = Depends(get_predictor)):
+    try:
+        result = predictor.train_model_incremental(
+            use_hourly=hourly,
+            estimator=estimator,
+            batch_size=batch_size,
+            source=source,
+            resume=resume
+        )
+
+        if result:
+            return {
+                "message": "Model trained successfully",
+                "status": "success",
+                "metrics": result
+            }
+        else:
+            raise HTTPException(status_code=500, detail="Failed to train model")
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error training model: {str(e)}")
+
+
+@router.post("/backtest")
+def backtest(hourly: bool = True,
+             folds: int = Query(Config.BACKTEST_FOLDS, ge=1, le=52),
+             horizon_days: int = Query(Config.BACKTEST_HORIZON_DAYS, ge=1),
+             max_workers: int = Query(Config.BACKTEST_MAX_WORKERS, ge=1, le=os.cpu_count() or 1),
+             engine=Depends(get_backtest_engine)):
+    try:
+        result = engine.run(
+            use_hourly=hourly,
+            folds=folds,
+            horizon_days=horizon_days,
+            max_workers=max_workers
+        )
+
+        if result:
+            return {
+                "backtest": result,
+                "status": "success"
+            }
+        else:
+            raise HTTPException(status_code=500, detail="Failed to run backtest")
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running backtest: {str(e)}")
+
+
 @router.post("/predict")
-async def predict_data(request: Optional[PredictionRequest] = None):
+async def predict_data(request: Optional[PredictionRequest] = None,
+                       predictor: BikeSharingPredictor = Depends(get_predictor),
+                       output_format: str = Depends(response_format)):
     try:
         if request is None:
             request = PredictionRequest()
@@ -139,13 +327,70 @@ async def predict_data(request: Optional[PredictionRequest] = None):
         )
 
         if prediction is not None:
-            return {
-                "prediction": max(0, round(prediction)),  # Ensure non-negative
-                "input_features": request.dict(),
+            return encode_response({
+                "prediction": max(0, round(float(prediction))),  # Ensure non-negative
+                "input_features": request.model_dump(),
                 "status": "success"
-            }
+            }, output_format)
         else:
             raise HTTPException(status_code=500, detail="Failed to make prediction")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error making prediction: {str(e)}")
+
+
+@router.post("/forecast")
+async def forecast(request: ForecastRequest,
+                   predictor: BikeSharingPredictor = Depends(get_predictor),
+                   output_format: str = Depends(columnar_response_format)):
+    try:
+        result = predictor.forecast(
+            start=request.start,
+            horizon_hours=request.horizon_hours,
+            weather_outlook=[outlook.model_dump() for outlook in request.weather]
+        )
+
+        if result is not None:
+            return encode_response({
+                "forecast": result,
+                "status": "success"
+            }, output_format, columns={"timestamp": result["timestamp"], "prediction": result["prediction"]})
+        else:
+            raise HTTPException(status_code=500, detail="Failed to make forecast")
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error making forecast: {str(e)}")
+
+
+@router.get("/ready")
+def ready():
+    report = get_startup_report()
+    if not report["ready"]:
+        return JSONResponse(status_code=503, content={**report, "status": "warming_up"})
+
+    # A worker that cannot reach the database is not ready; a missing model is not fatal.
+    # The retry blocks while connecting, so this route is a plain def and runs in the threadpool.
+    if "database" in report["warmup_errors"]:
+        recheck_database()
+        report = get_startup_report()
+        if "database" in report["warmup_errors"]:
+            return JSONResponse(status_code=503, content={**report, "status": "database_unavailable"})
+
+    return {**report, "status": "ready"}
+
+
+@router.get("/metrics")
+async def get_metrics():
+    content, content_type = export_metrics()
+    return Response(content=content, media_type=content_type)
+
+
+@router.get("/profiles")
+async def get_profiles(limit: int = 10):
+    if not Config.PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+    return {
+        "profiles": request_profiler.get_slowest(limit),
+        "status": "success"
+    }
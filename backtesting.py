@@ -0,0 +1,119 @@
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict
+
+import numpy as np
+
+from config import Config
+from database import open_session
+from feature_store import FeatureStore
+
+
+def _run_fold(entry_dir: str, cutoff: str, train_end: int, test_end: int, n_estimators: int) -> Dict:
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import mean_squared_error, r2_score
+
+    # Workers map the cached feature files instead of receiving pickled copies of the arrays
+    X = np.load(os.path.join(entry_dir, "X.npy"), mmap_mode='r')
+    y = np.load(os.path.join(entry_dir, "y.npy"), mmap_mode='r')
+
+    start = time.perf_counter()
+    model = RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=1)
+    model.fit(X[:train_end], y[:train_end])
+    y_pred = model.predict(X[train_end:test_end])
+    y_test = y[train_end:test_end]
+
+    mse = mean_squared_error(y_test, y_pred)
+    return {
+        'cutoff': cutoff,
+        'train_rows': train_end,
+        'test_rows': test_end - train_end,
+        'mse': float(mse),
+        'rmse': float(np.sqrt(mse)),
+        'r2': float(r2_score(y_test, y_pred)),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+class BacktestEngine:
+    """Rolling-origin evaluation: each fold trains on all rows before a cutoff date and tests
+    on the following `horizon_days`, with folds running in parallel worker processes."""
+
+    def run(self, use_hourly: bool = True, folds: int = Config.BACKTEST_FOLDS,
+            horizon_days: int = Config.BACKTEST_HORIZON_DAYS,
+            max_workers: int = Config.BACKTEST_MAX_WORKERS) -> Dict:
+        start = time.perf_counter()
+        try:
+            db = open_session()
+            try:
+                entry_dir = FeatureStore().get_entry_dir(db, use_hourly)
+            finally:
+                db.close()
+
+            dates = np.load(os.path.join(entry_dir, "dates.npy"))
+            horizon = np.timedelta64(horizon_days, 'D')
+            min_train = np.timedelta64(Config.BACKTEST_MIN_TRAIN_DAYS, 'D')
+
+            # Consecutive test windows ending at the last day in the data
+            last_cutoff = dates[-1] + np.timedelta64(1, 'D') - horizon
+            cutoffs = [last_cutoff - horizon * i for i in reversed(range(folds))]
+            cutoffs = [cutoff for cutoff in cutoffs if cutoff - dates[0] >= min_train]
+            if not cutoffs:
+                raise ValueError("Not enough history for the requested folds and horizon")
+
+            bounds = [
+                (str(cutoff), int(np.searchsorted(dates, cutoff)), int(np.searchsorted(dates, cutoff + horizon)))
+                for cutoff in cutoffs
+            ]
+
+            # Each worker is a fresh interpreter, so never start more than there are cores or folds
+            max_workers = max(1, min(max_workers, os.cpu_count() or 1, len(bounds)))
+
+            # 'spawn' avoids forking a process that may be running server threads
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+                futures = [
+                    executor.submit(_run_fold, entry_dir, cutoff, train_end, test_end, Config.BACKTEST_N_ESTIMATORS)
+                    for cutoff, train_end, test_end in bounds
+                ]
+                fold_results = [future.result() for future in futures]
+
+            test_rows = np.array([fold['test_rows'] for fold in fold_results])
+            mse = np.array([fold['mse'] for fold in fold_results])
+            r2 = np.array([fold['r2'] for fold in fold_results])
+
+            return {
+                'folds': fold_results,
+                'aggregate': {
+                    'mean_rmse': float(np.sqrt(mse).mean()),
+                    'pooled_rmse': float(np.sqrt((mse * test_rows).sum() / test_rows.sum())),
+                    'mean_r2': float(r2.mean()),
+                    'std_rmse': float(np.sqrt(mse).std()),
+                },
+                'horizon_days': horizon_days,
+                'wall_time_seconds': round(time.perf_counter() - start, 3),
+            }
+        except Exception as e:
+            print(f"Error running backtest: {e}")
+            return {}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the bike sharing model")
+    parser.add_argument("--daily", action="store_true", help="backtest the daily model instead of the hourly one")
+    parser.add_argument("--folds", type=int, default=Config.BACKTEST_FOLDS)
+    parser.add_argument("--horizon-days", type=int, default=Config.BACKTEST_HORIZON_DAYS)
+    parser.add_argument("--workers", type=int, default=Config.BACKTEST_MAX_WORKERS)
+    args = parser.parse_args()
+
+    result = BacktestEngine().run(
+        use_hourly=not args.daily,
+        folds=args.folds,
+        horizon_days=args.horizon_days,
+        max_workers=args.workers
+    )
+    print(json.dumps(result, indent=4))
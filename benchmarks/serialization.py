@@ -0,0 +1,108 @@
+"""Compares serialization time and size of the largest API payloads across response encodings.
+
+"fastapi default" is the path used before the orjson response class: jsonable_encoder followed
+by json.dumps, as FastAPI does for plain dict return values. Payloads are synthetic but have the
+same shape and size as the real responses, so no database is needed.
+
+Run from the project root:
+    python benchmarks/serialization.py
+"""
+import json
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from serialization import encode_response  # noqa: E402
+from timeseries import BikeSharingTimeSeries  # noqa: E402
+
+REPEATS = 50
+
+
+def timeseries_payload(days: int = 731):
+    rng = np.random.default_rng(42)
+    series = BikeSharingTimeSeries()
+    dates = np.arange(np.datetime64('2011-01-01'), np.datetime64('2011-01-01') + days)
+    series.append_days(dates, {metric: rng.integers(20, 8000, days) for metric in series.METRICS})
+    hours = days * 24
+    series.append_hours(
+        rng.integers(0, 7, hours), rng.integers(0, 24, hours),
+        {metric: rng.integers(0, 900, hours).astype(float) for metric in series.METRICS}
+    )
+    result = series.to_dict()
+    return {"timeseries": result, "status": "success"}, result["daily"]
+
+
+def forecast_payload(hours: int = 14 * 24):
+    timestamps = np.arange(np.datetime64('2012-06-01T00'), np.datetime64('2012-06-01T00') + hours)
+    result = {
+        "granularity": "hourly",
+        "timestamp": [str(value) + ":00:00" for value in timestamps],
+        "prediction": np.random.default_rng(42).integers(0, 900, hours).tolist(),
+    }
+    return {"forecast": result, "status": "success"}, {"timestamp": result["timestamp"], "prediction": result["prediction"]}
+
+
+def analytics_payload():
+    rng = np.random.default_rng(42)
+
+    def section(keys):
+        return {
+            key: {
+                "avg_rentals": round(float(rng.uniform(0, 5000)), 2),
+                "total_rentals": int(rng.integers(0, 10 ** 6)),
+                "days_count": int(rng.integers(0, 800)),
+            }
+            for key in keys
+        }
+
+    result = {
+        "seasonal_analysis": section(["Winter", "Spring", "Summer", "Fall"]),
+        "hourly_patterns": section([f"hour_{hour}" for hour in range(24)]),
+        "weather_impact": section(["Clear/Partly Cloudy", "Misty/Cloudy", "Light Rain/Snow"]),
+        "monthly_trends": section([f"month_{month}" for month in range(1, 13)]),
+        "weekday_patterns": section([f"day_{day}" for day in range(7)]),
+        "temperature_analysis": section(["Cold", "Moderate", "Warm", "Hot"]),
+    }
+    return {"analytics": result, "status": "success"}, None
+
+
+def measure(function) -> float:
+    return min(timeit.repeat(function, number=1, repeat=REPEATS)) * 1000
+
+
+def run():
+    payloads = {
+        "/analytics/timeseries": timeseries_payload(),
+        "/forecast (14 days)": forecast_payload(),
+        "/analytics": analytics_payload(),
+    }
+
+    encoders = {
+        "fastapi default": lambda payload, columns: json.dumps(jsonable_encoder(payload)).encode(),
+        "orjson": lambda payload, columns: encode_response(payload, "json").body,
+        "msgpack": lambda payload, columns: encode_response(payload, "msgpack").body,
+        "arrow": lambda payload, columns: encode_response(payload, "arrow", columns).body,
+    }
+
+    print(f"{'payload':<24}{'encoding':<18}{'ms (best of %d)' % REPEATS:>18}{'bytes':>12}")
+    for name, (payload, columns) in payloads.items():
+        for encoding, encoder in encoders.items():
+            if encoding == "arrow" and columns is None:
+                continue
+            try:
+                size = len(encoder(payload, columns))
+            except ImportError as e:
+                print(f"{name:<24}{encoding:<18}{'skipped (' + e.name + ' not installed)':>30}")
+                continue
+            elapsed = measure(lambda: encoder(payload, columns))
+            print(f"{name:<24}{encoding:<18}{elapsed:>18.3f}{size:>12}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,86 @@
+"""Measures cold-start cost: module import time and time to first response of a fresh worker.
+
+Run from the project root, with the database configured as for the API (DATABASE_URL may
+point at any SQLAlchemy URL):
+    python benchmarks/startup.py
+"""
+import os
+import re
+import subprocess
+import sys
+import time
+
+import requests
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PORT = int(os.getenv("BENCHMARK_PORT", "8765"))
+
+
+def measure_import_time(top: int = 15):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+
+    # -X importtime lines look like: "import time:  self [us] | cumulative | imported package"
+    modules = []
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match and len(match.group(3)) <= 3:  # 'main' and the modules it imports directly
+            modules.append((int(match.group(2)), match.group(4)))
+
+    print(f"Interpreter start + 'import main': {wall:.3f}s")
+    print("Slowest imports:")
+    for cumulative, module in sorted(modules, reverse=True)[:top]:
+        print(f"  {cumulative / 1e6:8.3f}s  {module}")
+
+
+def poll(url: str, timeout: float = 30.0, expect_ok: bool = False):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            response = requests.get(url, timeout=1)
+            if not expect_ok or response.ok:
+                return response
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"No response from {url} within {timeout}s")
+
+
+def measure_time_to_first_response():
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=PROJECT_ROOT
+    )
+    try:
+        poll(f"http://127.0.0.1:{PORT}/")
+        first_response = time.perf_counter() - start
+
+        report = poll(f"http://127.0.0.1:{PORT}/ready", expect_ok=True).json()
+        ready = time.perf_counter() - start
+
+        while not report["preloaded"]:
+            time.sleep(0.05)
+            report = poll(f"http://127.0.0.1:{PORT}/ready", expect_ok=True).json()
+        preloaded = time.perf_counter() - start
+
+        print(f"Time to first response (/): {first_response:.3f}s")
+        print(f"Time to ready (/ready):     {ready:.3f}s")
+        print(f"Time to preloaded:          {preloaded:.3f}s")
+        print(f"Worker report: import {report['import_seconds']}s, database check {report['warmup_seconds']}s, "
+              f"preload {report['preload_seconds']}s")
+        if report["warmup_errors"]:
+            print(f"Warm-up errors: {report['warmup_errors']}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    measure_import_time()
+    print()
+    measure_time_to_first_response()
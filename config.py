@@ -13,19 +13,59 @@ class Config:
     DB_NAME = os.getenv("DB_NAME", "bike_sharing")
 
     # Database URL
-    DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    DATABASE_URL = os.getenv(
+        "DATABASE_URL", f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    )
 
     # Paths
     MODEL_PATH = "models/bike_sharing_model.pkl"
     ANALYTICS_PATH = "analytics/"
+    FEATURE_STORE_PATH = "data/features/"
 
     # Dataset configuration
     DATASET_URL = "https://archive.ics.uci.edu/static/public/275/bike+sharing+dataset.zip"
+    DATASET_TIMEZONE = "America/New_York"  # dteday and hr are local Washington, D.C. time
 
     # API configuration
     API_HOST = os.getenv("API_HOST", "0.0.0.0")
     API_PORT = int(os.getenv("API_PORT", "8000"))
 
+    # Analytics configuration
+    ANALYTICS_MAX_PARALLEL = int(os.getenv("ANALYTICS_MAX_PARALLEL", "4"))  # 1 runs sections sequentially
+    ANALYTICS_SECTION_TIMEOUT = float(os.getenv("ANALYTICS_SECTION_TIMEOUT", "10"))  # seconds
+
+    # Feature store configuration
+    # Superseded cache entries are kept this long, so readers that resolved them can finish
+    FEATURE_STORE_RETENTION_SECONDS = int(os.getenv("FEATURE_STORE_RETENTION_SECONDS", "3600"))
+
+    # Incremental training configuration
+    TRAIN_BATCH_SIZE = int(os.getenv("TRAIN_BATCH_SIZE", "5000"))
+    TRAIN_TREES_PER_BATCH = 10
+    TRAIN_HOLDOUT_MODULUS = 5  # rows with instant % 5 == 0 form the holdout set (20%)
+
+    # Backtesting configuration
+    BACKTEST_FOLDS = 6
+    BACKTEST_HORIZON_DAYS = 30
+    BACKTEST_MIN_TRAIN_DAYS = 90
+    BACKTEST_N_ESTIMATORS = 100
+    BACKTEST_MAX_WORKERS = int(os.getenv("BACKTEST_MAX_WORKERS", str(os.cpu_count() or 1)))
+
+    # Distribution sketches configuration
+    SKETCH_COMPRESSION = 100
+    SKETCH_HISTOGRAM_BIN_WIDTH = 25
+    SKETCH_EXACT_MAX_ROWS = int(os.getenv("SKETCH_EXACT_MAX_ROWS", "10000"))
+
+    # Startup configuration
+    WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+    # Profiling configuration
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles/")
+    PROFILE_REQUEST_HEADER = "X-Profile"
+    PROFILE_ID_HEADER = "X-Profile-Id"
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))  # seconds
+    PROFILE_HISTORY = int(os.getenv("PROFILE_HISTORY", "50"))
+
     # App configuration
     APP_NAME = "Bike Sharing API"
     VERSION = "1.0.0"
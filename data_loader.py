@@ -1,10 +1,9 @@
-import pandas as pd
 import os
+import json
 import zipfile
-import requests
 from sqlalchemy.orm import Session
 
-from database import DailyData, HourlyData, SessionLocal, create_db_tables
+from database import DailyData, HourlyData, DistributionSketch, open_session, create_db_tables
 from config import Config
 
 
@@ -12,14 +11,16 @@ class DataLoader:
     def __init__(self):
         self.data_dir = "data"
         self.models_dir = "models"
-        self.ensure_directories()
 
     def ensure_directories(self):
         os.makedirs(self.data_dir, exist_ok=True)
         os.makedirs(self.models_dir, exist_ok=True)
 
     def download_dataset(self):
+        import requests
+
         try:
+            self.ensure_directories()
             zip_path = os.path.join(self.data_dir, "bike_sharing_dataset.zip")
 
             if not os.path.exists(zip_path):
@@ -38,6 +39,8 @@ class DataLoader:
             return False
 
     def load_csv_data(self):
+        import pandas as pd
+
         try:
             day_file = None
             hour_file = None
@@ -64,9 +67,32 @@ class DataLoader:
             print(f"Error loading CSV data: {e}")
             return {}
 
+    def build_distribution_sketches(self, db: Session, hourly_df):
+        from sketches import TDigest, FixedWidthHistogram
+
+        db.query(DistributionSketch).delete()
+
+        buckets = hourly_df.groupby(['hr', 'season', 'weathersit'])['cnt']
+        for (hr, season, weathersit), values in buckets:
+            values = values.to_numpy(dtype=float)
+            digest = TDigest.from_values(values, Config.SKETCH_COMPRESSION)
+            histogram = FixedWidthHistogram.from_values(values, Config.SKETCH_HISTOGRAM_BIN_WIDTH)
+            db.add(DistributionSketch(
+                hr=int(hr),
+                season=int(season),
+                weathersit=int(weathersit),
+                count=len(values),
+                digest=json.dumps(digest.to_dict()),
+                histogram=json.dumps(histogram.to_dict())
+            ))
+
+        print(f"Built {buckets.ngroups} distribution sketches")
+
     def load_to_database(self, db: Session = None):
+        import pandas as pd
+
         if db is None:
-            db = SessionLocal()
+            db = open_session()
 
         try:
             if not self.download_dataset():
@@ -137,6 +163,8 @@ class DataLoader:
 
                 print(f"Loaded {len(data['hourly'])} hourly records to database")
 
+                self.build_distribution_sketches(db, data['hourly'])
+
             db.commit()  # apply changes
             return True
 
@@ -1,10 +1,15 @@
-from sqlalchemy import create_engine, Column, Integer, Float, Date
+from sqlalchemy import create_engine, Column, Integer, Float, Date, Text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+import threading
+
 from config import Config
+from metrics import instrument_engine
 
-engine = create_engine(Config.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# The engine is created on first use so importing this module stays cheap
+_engine = None
+_engine_lock = threading.Lock()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()  # Base class for models representing database tables
 
 
@@ -12,7 +17,7 @@ class DailyData(Base):
     __tablename__ = "day"
 
     instant = Column(Integer, primary_key=True, index=True)
-    dteday = Column(Date)
+    dteday = Column(Date, index=True)
     season = Column(Integer)
     yr = Column(Integer)
     mnth = Column(Integer)
@@ -53,7 +58,7 @@ class HourlyData(Base):
     __tablename__ = "hour"
 
     instant = Column(Integer, primary_key=True, index=True)
-    dteday = Column(Date)
+    dteday = Column(Date, index=True)
     season = Column(Integer)
     yr = Column(Integer)
     mnth = Column(Integer)
@@ -92,8 +97,38 @@ class HourlyData(Base):
         }
 
 
+class DistributionSketch(Base):
+    """Mergeable t-digest and histogram of hourly cnt for one (hr, season, weathersit) bucket."""
+    __tablename__ = "distribution_sketch"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    hr = Column(Integer)
+    season = Column(Integer)
+    weathersit = Column(Integer)
+    count = Column(Integer)
+    digest = Column(Text)  # JSON-encoded sketches.TDigest
+    histogram = Column(Text)  # JSON-encoded sketches.FixedWidthHistogram
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(Config.DATABASE_URL)
+                instrument_engine(engine)
+                SessionLocal.configure(bind=engine)
+                _engine = engine
+    return _engine
+
+
+def open_session() -> Session:
+    get_engine()
+    return SessionLocal()
+
+
 def get_db():
-    db = SessionLocal()
+    db = open_session()
     try:
         yield db
     finally:
@@ -101,4 +136,10 @@ def get_db():
 
 
 def create_db_tables():
+    engine = get_engine()
     Base.metadata.create_all(bind=engine)
+
+    # create_all skips tables that already exist, so add indexes introduced after their creation
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
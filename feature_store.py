@@ -0,0 +1,210 @@
+import hashlib
+import os
+import shutil
+import time
+from typing import Iterator, List, Mapping, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import extract, func
+from sqlalchemy.orm import Session
+
+from config import Config
+from database import DailyData, HourlyData
+
+# Bump whenever the feature list or how a feature is derived changes, so stale caches are ignored
+FEATURE_SCHEMA_VERSION = 2
+
+HOURLY_FEATURES = (
+    'season', 'yr', 'mnth', 'hr', 'holiday', 'weekday', 'workingday',
+    'weathersit', 'temp', 'atemp', 'hum', 'windspeed', 'day',
+)
+DAILY_FEATURES = tuple(name for name in HOURLY_FEATURES if name != 'hr')
+TARGET = 'cnt'
+
+
+def feature_names(hourly: bool) -> Tuple[str, ...]:
+    return HOURLY_FEATURES if hourly else DAILY_FEATURES
+
+
+def to_matrix(columns: Mapping, names: Sequence[str]) -> np.ndarray:
+    """Stacks named feature columns (or scalars, for a single row) into a float32 matrix in schema order."""
+    return np.ascontiguousarray(
+        np.column_stack([np.atleast_1d(columns[name]) for name in names]), dtype=np.float32
+    )
+
+
+class FeatureStore:
+    """Feature matrices cached on disk as .npy files, one directory per schema and data version.
+
+    A cached entry holds `X.npy` (float32, C-contiguous, columns in schema order), `y.npy`
+    (float32 target), `dates.npy` (datetime64[D] of each row) and `instant.npy` (row ids),
+    all ordered by `instant`.
+    """
+
+    def __init__(self):
+        self.root = Config.FEATURE_STORE_PATH
+
+    @staticmethod
+    def _table(hourly: bool):
+        return HourlyData if hourly else DailyData
+
+    def data_version(self, db: Session, hourly: bool) -> str:
+        """Fingerprint of every column the cache holds. Plain sums catch edited values; sums
+        weighted by instant also catch values moved between rows."""
+        table = self._table(hourly)
+        columns = [table.cnt] + self._feature_columns(hourly)
+        summary = db.query(
+            func.count(table.instant),
+            func.max(table.instant),
+            func.max(table.dteday),
+            *[func.sum(column) for column in columns],
+            *[func.sum(column * table.instant) for column in columns]
+        ).first()
+        fingerprint = f"{FEATURE_SCHEMA_VERSION}:{':'.join(str(value) for value in summary)}"
+        return hashlib.sha1(fingerprint.encode()).hexdigest()[:16]
+
+    def _entry_dir(self, hourly: bool, version: str) -> str:
+        granularity = 'hour' if hourly else 'day'
+        return os.path.join(self.root, f"{granularity}-v{FEATURE_SCHEMA_VERSION}-{version}")
+
+    def _prune(self, hourly: bool):
+        """Removes entries of one granularity that were superseded more than
+        FEATURE_STORE_RETENTION_SECONDS ago. The latest entry is always kept, and recently
+        superseded ones stay so that readers which resolved them earlier (e.g. backtest workers
+        that load the files after starting) can finish. Builds in progress (.tmp-) are skipped."""
+        prefix = f"{'hour' if hourly else 'day'}-v"
+        entries = sorted(
+            (os.path.getmtime(path), path)
+            for path in (os.path.join(self.root, name) for name in os.listdir(self.root)
+                         if name.startswith(prefix) and '.tmp-' not in name)
+        )
+        cutoff = time.time() - Config.FEATURE_STORE_RETENTION_SECONDS
+        # An entry was superseded when the next newer entry was written
+        for (_, path), (superseded_at, _) in zip(entries, entries[1:]):
+            if superseded_at < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _feature_columns(self, hourly: bool) -> List:
+        table = self._table(hourly)
+        return [
+            extract('day', table.dteday).label(name) if name == 'day' else getattr(table, name)
+            for name in feature_names(hourly)
+        ]
+
+    def _query(self, db: Session, hourly: bool):
+        table = self._table(hourly)
+        return db.query(table.instant, table.dteday, table.cnt, *self._feature_columns(hourly)).order_by(table.instant)
+
+    @staticmethod
+    def _to_arrays(rows) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        instants = np.array([row[0] for row in rows], dtype=np.int64)
+        dates = np.array([row[1] for row in rows], dtype='datetime64[D]')
+        y = np.array([row[2] for row in rows], dtype=np.float32)
+        X = np.ascontiguousarray(np.array([row[3:] for row in rows], dtype=np.float32))
+        return X, y, dates, instants
+
+    def _keyset_batches(self, db: Session, hourly: bool, batch_size: int, after_instant: int = 0
+                        ) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+        """Yields (X, y, dates, instants) for rows with instant > after_instant, one keyset page at a time."""
+        table = self._table(hourly)
+        last_instant = after_instant
+        while True:
+            rows = self._query(db, hourly).filter(table.instant > last_instant).limit(batch_size).all()
+            if not rows:
+                return
+            batch = self._to_arrays(rows)
+            last_instant = int(batch[3][-1])
+            yield batch
+
+    def iter_batches(self, db: Session, hourly: bool, batch_size: int, after_instant: int = 0,
+                     source: str = 'db') -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Yields (X, y, instants) batches of rows with instant > after_instant, in instant order.
+
+        With source='db' each batch is a keyset-paginated query; with source='snapshot' the
+        cached .npy files are memory-mapped and sliced. Either way, only one batch is
+        materialised in memory at a time.
+        """
+        if source == 'snapshot':
+            entry_dir = self.get_entry_dir(db, hourly)
+            X, y, instants = (
+                np.load(os.path.join(entry_dir, f"{name}.npy"), mmap_mode='r')
+                for name in ('X', 'y', 'instant')
+            )
+            start = int(np.searchsorted(instants, after_instant, side='right'))
+            for offset in range(start, len(y), batch_size):
+                batch = slice(offset, offset + batch_size)
+                yield np.array(X[batch]), np.array(y[batch]), np.array(instants[batch])
+            return
+
+        for X, y, _, instants in self._keyset_batches(db, hourly, batch_size, after_instant):
+            yield X, y, instants
+
+    def load(self, db: Session, hourly: bool, mmap: bool = False) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns (X, y, dates) for the current data, building and caching them on a miss."""
+        entry_dir = self.get_entry_dir(db, hourly)
+        mmap_mode = 'r' if mmap else None
+        return tuple(
+            np.load(os.path.join(entry_dir, f"{name}.npy"), mmap_mode=mmap_mode)
+            for name in ('X', 'y', 'dates')
+        )
+
+    def _write_entry(self, db: Session, hourly: bool, entry_dir: str) -> int:
+        """Streams the table into the .npy files of `entry_dir` one keyset page at a time, so peak
+        memory is bounded by Config.TRAIN_BATCH_SIZE rows rather than the table size."""
+        table = self._table(hourly)
+        total = db.query(func.count(table.instant)).scalar() or 0
+        if not total:
+            raise ValueError("No data available to build features")
+
+        n_features = len(feature_names(hourly))
+        files = {
+            'X': np.lib.format.open_memmap(os.path.join(entry_dir, "X.npy"), mode='w+',
+                                           dtype=np.float32, shape=(total, n_features)),
+            'y': np.lib.format.open_memmap(os.path.join(entry_dir, "y.npy"), mode='w+',
+                                           dtype=np.float32, shape=(total,)),
+            'dates': np.lib.format.open_memmap(os.path.join(entry_dir, "dates.npy"), mode='w+',
+                                               dtype='datetime64[D]', shape=(total,)),
+            'instant': np.lib.format.open_memmap(os.path.join(entry_dir, "instant.npy"), mode='w+',
+                                                 dtype=np.int64, shape=(total,)),
+        }
+
+        offset = 0
+        for batch in self._keyset_batches(db, hourly, Config.TRAIN_BATCH_SIZE):
+            end = offset + len(batch[1])
+            if end > total:
+                raise ValueError("Rows were added while building the feature cache")
+            for array, values in zip(files.values(), batch):
+                array[offset:end] = values
+            offset = end
+        if offset != total:
+            raise ValueError("Rows were removed while building the feature cache")
+
+        for array in files.values():
+            array.flush()
+        del files
+        return total
+
+    def get_entry_dir(self, db: Session, hourly: bool) -> str:
+        """Directory of the cached entry for the current data, building it on a miss."""
+        entry_dir = self._entry_dir(hourly, self.data_version(db, hourly))
+        if os.path.exists(entry_dir):
+            return entry_dir
+
+        # Write into a temporary directory and rename it, so readers never see a partial entry
+        tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            rows = self._write_entry(db, hourly, tmp_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Another worker cached the same version first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        else:
+            self._prune(hourly)
+
+        print(f"Cached {rows} feature rows in {entry_dir}")
+        return entry_dir
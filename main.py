@@ -1,17 +1,37 @@
+import time
+
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI
-import uvicorn
+from fastapi.responses import ORJSONResponse
 
 from config import Config
-from api.routes import router
+from api.routes import router, get_predictor
+from metrics import MetricsMiddleware
+from profiling import ProfilingMiddleware
+from startup import record_import_time, start_warm_up
 
 app = FastAPI(
     title=Config.APP_NAME,
     description=Config.DESCRIPTION,
-    version=Config.VERSION
+    version=Config.VERSION,
+    default_response_class=ORJSONResponse
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
 app.include_router(router)
 
+
+@app.on_event("startup")
+async def on_startup():
+    start_warm_up(get_predictor())
+
+
+record_import_time(time.perf_counter() - _import_started)
+
 if __name__ == '__main__':
+    import uvicorn
+
     uvicorn.run(
         "main:app",
         host=Config.API_HOST,
@@ -0,0 +1,149 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from prometheus_client import Counter, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import event
+
+REQUEST_LATENCY = Histogram(
+    "bike_sharing_request_duration_seconds",
+    "HTTP request latency per route",
+    ["method", "route", "status"]
+)
+SQL_QUERIES_PER_REQUEST = Histogram(
+    "bike_sharing_sql_queries_per_request",
+    "Number of SQL statements executed while serving a request",
+    ["route"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 500)
+)
+SQL_TIME_PER_REQUEST = Histogram(
+    "bike_sharing_sql_duration_per_request_seconds",
+    "Total time spent in SQL statements while serving a request",
+    ["route"]
+)
+SQL_QUERY_LATENCY = Histogram(
+    "bike_sharing_sql_query_duration_seconds",
+    "Latency of individual SQL statements"
+)
+SQL_QUERIES_TOTAL = Counter(
+    "bike_sharing_sql_queries_total",
+    "Total number of SQL statements executed"
+)
+SQL_QUERY_ERRORS = Counter(
+    "bike_sharing_sql_query_errors_total",
+    "Total number of SQL statements that raised an error"
+)
+MODEL_FIT_LATENCY = Histogram(
+    "bike_sharing_model_fit_duration_seconds",
+    "Time spent fitting the prediction model",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+MODEL_PREDICT_LATENCY = Histogram(
+    "bike_sharing_model_predict_duration_seconds",
+    "Time spent in model predict calls",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+)
+
+
+class _QueryStats:
+    __slots__ = ("count", "duration", "lock")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        # Analytics sections run on worker threads that share the request's accumulator
+        self.lock = threading.Lock()
+
+
+# Per-request SQL accumulator, set by MetricsMiddleware for the lifetime of a request
+_query_stats: ContextVar[Optional[_QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _record_query(conn):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    SQL_QUERY_LATENCY.observe(elapsed)
+    SQL_QUERIES_TOTAL.inc()
+
+    stats = _query_stats.get()
+    if stats is not None:
+        with stats.lock:
+            stats.count += 1
+            stats.duration += elapsed
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_query(conn)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not fire for failed statements; without this their start times
+    # would pile up on the pooled connection and they would be missing from the request's totals
+    conn = exception_context.connection
+    executing = exception_context.execution_context is not None
+    if conn is not None and executing and conn.info.get("query_start_time"):
+        SQL_QUERY_ERRORS.inc()
+        _record_query(conn)
+
+
+def instrument_engine(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+@contextmanager
+def track_model_fit():
+    with MODEL_FIT_LATENCY.time():
+        yield
+
+
+@contextmanager
+def track_model_predict():
+    with MODEL_PREDICT_LATENCY.time():
+        yield
+
+
+def export_metrics():
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and SQL usage per route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        stats = _QueryStats()
+        token = _query_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _query_stats.reset(token)
+
+            # Use the route template so that path parameters do not explode label cardinality
+            route = scope.get("route")
+            route_path = route.path if route is not None else "unmatched"
+
+            REQUEST_LATENCY.labels(scope["method"], route_path, str(status["code"])).observe(elapsed)
+            SQL_QUERIES_PER_REQUEST.labels(route_path).observe(stats.count)
+            SQL_TIME_PER_REQUEST.labels(route_path).observe(stats.duration)
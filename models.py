@@ -1,60 +1,41 @@
-import numpy as np
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import mean_squared_error, r2_score
-import joblib
 import os
 
-from database import DailyData, HourlyData, SessionLocal
+from database import open_session
 from config import Config
+from metrics import track_model_fit, track_model_predict
 
 
 class BikeSharingPredictor:
     def __init__(self):
         self.model = None
-    def load_data_from_db(self, use_hourly=False):
-        db = SessionLocal()
-        try:
-            if use_hourly:
-                query = db.query(HourlyData).all()
-                data = [record.to_dict() for record in query]
-            else:
-                query = db.query(DailyData).all()
-                data = [record.to_dict() for record in query]
-
-            df = pd.DataFrame(data)
-            return df
-        finally:
-            db.close()
-
-    def prepare_features(self, df):
-        df['day'] = pd.to_datetime(df['dteday'], errors='coerce').dt.day
-        X = df.drop(columns=['instant', 'casual', 'registered', 'dteday', 'cnt'])
-        y = df['cnt']
-
-        feature_names = X.columns.tolist()
-        return X, y, feature_names
+        self.feature_names = None
+        self.last_instant = None  # newest row seen by incremental training
 
     def train_model(self, use_hourly=False):
-        try:
-            df = self.load_data_from_db(use_hourly)
-
-            if df.empty:
-                raise ValueError("No data available for training")
+        import numpy as np
+        from sklearn.model_selection import train_test_split
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.metrics import mean_squared_error, r2_score
+        from feature_store import FeatureStore, feature_names
 
-            print(f"Training with {len(df)} records")
+        db = open_session()
+        try:
+            X, y, _ = FeatureStore().load(db, use_hourly)
 
-            X, y, feature_names = self.prepare_features(df)
+            print(f"Training with {len(y)} records")
 
             X_train, X_test, y_train, y_test = train_test_split(
                 X, y, test_size=0.2, random_state=42
             )
 
             self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-            self.model.fit(X_train, y_train)
+            self.feature_names = list(feature_names(use_hourly))
+            self.last_instant = None
+            with track_model_fit():
+                self.model.fit(X_train, y_train)
 
-            y_pred = self.model.predict(X_test)
+            with track_model_predict():
+                y_pred = self.model.predict(X_test)
             mse = mean_squared_error(y_test, y_pred)
             rmse = np.sqrt(mse)
             r2 = r2_score(y_test, y_pred)
@@ -76,23 +57,148 @@ class BikeSharingPredictor:
         except Exception as e:
             print(f"Error training model: {e}")
             return None
+        finally:
+            db.close()
+
+    def _new_incremental_model(self, estimator):
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.linear_model import SGDRegressor
+        from sklearn.pipeline import make_pipeline
+        from sklearn.preprocessing import StandardScaler
+
+        if estimator == 'forest':
+            # Each batch grows the forest by TRAIN_TREES_PER_BATCH trees fitted on that batch only
+            return RandomForestRegressor(n_estimators=0, warm_start=True, random_state=42)
+        if estimator == 'sgd':
+            return make_pipeline(StandardScaler(), SGDRegressor(random_state=42))
+        raise ValueError(f"Unsupported incremental estimator: {estimator}")
+
+    @staticmethod
+    def _partial_fit(model, X, y):
+        if hasattr(model, 'steps'):
+            scaler, regressor = model[0], model[-1]
+            scaler.partial_fit(X)
+            regressor.partial_fit(scaler.transform(X), y)
+        else:
+            model.n_estimators += Config.TRAIN_TREES_PER_BATCH
+            model.fit(X, y)
+
+    def train_model_incremental(self, use_hourly=True, estimator='forest',
+                                batch_size=Config.TRAIN_BATCH_SIZE, source='db', resume=False):
+        import numpy as np
+        from feature_store import FeatureStore, feature_names
+
+        store = FeatureStore()
+        db = open_session()
+        try:
+            # Train a separate estimator, so requests keep using the current model until this one is ready
+            names = list(feature_names(use_hourly))
+            last_instant = 0
+            if resume:
+                saved = BikeSharingPredictor()
+                if not saved.load_model() or saved.last_instant is None:
+                    raise ValueError("No incrementally trained model to resume")
+                if saved.feature_names != names:
+                    raise ValueError("Saved model was trained with a different feature set")
+                model = saved.model
+                last_instant = saved.last_instant
+            else:
+                model = self._new_incremental_model(estimator)
+
+            # Rows whose instant falls on the holdout modulus are never trained on
+            trained_rows = 0
+            batches = 0
+            with track_model_fit():
+                for X, y, instants in store.iter_batches(db, use_hourly, batch_size, last_instant, source):
+                    train_mask = instants % Config.TRAIN_HOLDOUT_MODULUS != 0
+                    if train_mask.any():
+                        self._partial_fit(model, X[train_mask], y[train_mask])
+                        trained_rows += int(train_mask.sum())
+                        batches += 1
+                    last_instant = int(instants[-1])
+
+            if batches == 0 and not resume:
+                raise ValueError("No data available for training")
+
+            # Streaming holdout evaluation: only running sums are kept between batches
+            count, sum_y, sum_y2, sse = 0, 0.0, 0.0, 0.0
+            for X, y, instants in store.iter_batches(db, use_hourly, batch_size, 0, source):
+                holdout_mask = instants % Config.TRAIN_HOLDOUT_MODULUS == 0
+                if not holdout_mask.any():
+                    continue
+                y_true = y[holdout_mask].astype(np.float64)
+                with track_model_predict():
+                    y_pred = model.predict(X[holdout_mask])
+                count += len(y_true)
+                sum_y += y_true.sum()
+                sum_y2 += np.square(y_true).sum()
+                sse += np.square(y_true - y_pred).sum()
+
+            mse = sse / count if count else float('nan')
+            total_variance = sum_y2 - sum_y ** 2 / count if count else float('nan')
+            r2 = 1 - sse / total_variance if count else float('nan')
+
+            self.model = model
+            self.feature_names = names
+            self.last_instant = last_instant
+            self.save_model()
+
+            print(f"Incremental training finished: {trained_rows} rows in {batches} batches")
+            print(f"RMSE: {np.sqrt(mse):.2f}")
+            print(f"R²: {r2:.4f}")
+
+            return {
+                'mse': mse,
+                'rmse': float(np.sqrt(mse)),
+                'r2': r2,
+                'model_type': (model[-1] if hasattr(model, 'steps') else model).__class__.__name__,
+                'rows_trained': trained_rows,
+                'batches': batches,
+                'holdout_rows': count,
+                'last_instant': last_instant,
+            }
+
+        except Exception as e:
+            print(f"Error training model incrementally: {e}")
+            return None
+        finally:
+            db.close()
 
     def save_model(self):
+        import joblib
+        from feature_store import FEATURE_SCHEMA_VERSION
+
         try:
+            os.makedirs(os.path.dirname(Config.MODEL_PATH), exist_ok=True)
             if os.path.exists(Config.MODEL_PATH):
                 os.remove(Config.MODEL_PATH)
                 print(f"Removed existing model: {Config.MODEL_PATH}")
 
-            joblib.dump(self.model, Config.MODEL_PATH)
+            joblib.dump({
+                'model': self.model,
+                'feature_names': self.feature_names,
+                'schema_version': FEATURE_SCHEMA_VERSION,
+                'last_instant': self.last_instant,
+            }, Config.MODEL_PATH)
 
             print("Model saved successfully")
         except Exception as e:
             print(f"Error saving model: {e}")
 
     def load_model(self):
+        import joblib
+
         try:
             if os.path.exists(Config.MODEL_PATH):
-                self.model = joblib.load(Config.MODEL_PATH)
+                saved = joblib.load(Config.MODEL_PATH)
+                if isinstance(saved, dict):
+                    self.model = saved['model']
+                    self.feature_names = saved['feature_names']
+                    self.last_instant = saved.get('last_instant')
+                else:
+                    # Models saved before the feature store were fitted on DataFrames
+                    self.model = saved
+                    self.feature_names = list(saved.feature_names_in_)
                 return True
             else:
                 print("Model files not found")
@@ -105,6 +211,8 @@ class BikeSharingPredictor:
     def predict(self, season=1, month=1, day=1, weekday=1, hour=12,
                 temp=0.5, humidity=0.5, windspeed=0.2,
                 year=1, holiday=0, workingday=1, weathersit=1):
+        from feature_store import to_matrix
+
         features = {
             'season': season,
             'yr': year,
@@ -126,14 +234,87 @@ class BikeSharingPredictor:
                 if not self.load_model():
                     raise ValueError("Model not trained or loaded")
 
-
-            if isinstance(features, dict):
-                features = pd.DataFrame([features])
-
-            prediction = self.model.predict(features)
+            with track_model_predict():
+                prediction = self.model.predict(to_matrix(features, self.feature_names))
 
             return prediction[0] if len(prediction) == 1 else prediction
 
         except Exception as e:
             print(f"Error making prediction: {e}")
             return None
+
+    def build_forecast_features(self, start, periods, hourly=True, weather_outlook=None):
+        import numpy as np
+        import pandas as pd
+        from pandas.tseries.holiday import USFederalHolidayCalendar
+
+        freq = 'H' if hourly else 'D'
+        start = pd.Timestamp(start)
+        if start.tzinfo is not None:
+            # Features are derived from the dataset's naive local time
+            start = start.tz_convert(Config.DATASET_TIMEZONE).tz_localize(None)
+        index = pd.date_range(start.floor(freq), periods=periods, freq=freq)
+        dates = index.normalize()
+
+        month = index.month.to_numpy()
+        month_day = month * 100 + index.day.to_numpy()
+        # Seasons follow the dataset: 1 winter, 2 spring, 3 summer, 4 fall, switching at solstices/equinoxes
+        season = np.select(
+            [(month_day < 321) | (month_day >= 1221), month_day < 621, month_day < 923],
+            [1, 2, 3],
+            default=4
+        )
+        holiday = dates.isin(USFederalHolidayCalendar().holidays(dates[0], dates[-1])).astype(int)
+        weekday = (index.dayofweek.to_numpy() + 1) % 7  # dataset weekdays start at 0 = Sunday
+        workingday = ((weekday != 0) & (weekday != 6) & (holiday == 0)).astype(int)
+
+        # One weather entry per day of the horizon; the last entry covers any remaining days
+        if not weather_outlook:
+            weather_outlook = [{'temp': 0.5, 'humidity': 0.5, 'windspeed': 0.2, 'weathersit': 1}]
+        weather = pd.DataFrame(weather_outlook)
+        day_offsets = np.minimum((dates - dates[0]).days.to_numpy(), len(weather) - 1)
+        temp = weather['temp'].to_numpy()[day_offsets]
+
+        features = {
+            'season': season,
+            'yr': index.year.to_numpy() - 2011,
+            'mnth': month,
+            'hr': index.hour.to_numpy(),
+            'holiday': holiday,
+            'weekday': weekday,
+            'workingday': workingday,
+            'weathersit': weather['weathersit'].to_numpy()[day_offsets],
+            'temp': temp,
+            'atemp': temp,
+            'hum': weather['humidity'].to_numpy()[day_offsets],
+            'windspeed': weather['windspeed'].to_numpy()[day_offsets],
+            'day': index.day.to_numpy(),
+        }
+        return index, features
+
+    def forecast(self, start, horizon_hours=168, weather_outlook=None):
+        import numpy as np
+        from feature_store import to_matrix
+
+        try:
+            if self.model is None:
+                if not self.load_model():
+                    raise ValueError("Model not trained or loaded")
+
+            hourly = 'hr' in self.feature_names
+            periods = horizon_hours if hourly else int(np.ceil(horizon_hours / 24))
+
+            index, features = self.build_forecast_features(start, periods, hourly, weather_outlook)
+
+            with track_model_predict():
+                predictions = self.model.predict(to_matrix(features, self.feature_names))
+
+            return {
+                'granularity': 'hourly' if hourly else 'daily',
+                'timestamp': index.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
+                'prediction': np.maximum(0, np.rint(predictions)).astype(int).tolist(),
+            }
+
+        except Exception as e:
+            print(f"Error making forecast: {e}")
+            return None
@@ -0,0 +1,276 @@
+import cProfile
+import functools
+import inspect
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi.routing import APIRoute
+
+from config import Config
+
+
+class StackSampler:
+    """Samples the call stacks of a set of threads to build collapsed stacks for flamegraphs.
+
+    Each stack is rooted at the name of its thread, so worker threads show up as separate towers.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_ids = {thread_id}
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id in list(self.thread_ids):
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if stack:
+                    stack.append(names.get(thread_id, str(thread_id)))
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def add_thread(self, thread_id: int):
+        self.thread_ids.add(thread_id)
+
+    def remove_thread(self, thread_id: int):
+        self.thread_ids.discard(thread_id)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write_collapsed(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfilingSession:
+    """Profilers of one request: cProfile and the sampler on the request thread, plus the
+    cProfile instances of worker threads that joined through `profile_thread`."""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), Config.PROFILE_SAMPLE_INTERVAL)
+        self.thread_profilers = []
+        self.overlapping_requests = 0
+        self.stopped = False
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def join_thread(self) -> bool:
+        with self._lock:
+            if self.stopped:
+                return False
+            self.sampler.add_thread(threading.get_ident())
+            return True
+
+    def leave_thread(self, profiler: Optional[cProfile.Profile]):
+        with self._lock:
+            self.sampler.remove_thread(threading.get_ident())
+            # Threads still running when the request finished are left out of the profile
+            if profiler is not None and not self.stopped:
+                self.thread_profilers.append(profiler)
+
+    def stop(self):
+        with self._lock:
+            self.stopped = True
+        self.profiler.disable()
+        self.sampler.stop()
+
+    def dump_stats(self, path: str):
+        stats = pstats.Stats(self.profiler)
+        for profiler in self.thread_profilers:
+            stats.add(profiler)
+        stats.dump_stats(path)
+
+
+# Up to 3.11 cProfile hooks the thread it is enabled on. From 3.12 it is built on sys.monitoring:
+# the request's profiler already sees every thread, and enabling a second one raises ValueError.
+_PER_THREAD_PROFILER = sys.version_info < (3, 12)
+
+# Session of the request being profiled; worker threads see it through copied contexts
+_current_session: ContextVar[Optional[ProfilingSession]] = ContextVar("profiling_session", default=None)
+
+
+@contextmanager
+def profile_thread():
+    """Adds the calling worker thread to the profile of the request that submitted the work, if any.
+
+    cProfile and the stack sampler only see the thread they were started on, so code that hands
+    request work to a thread pool runs it inside this context manager (with the request's
+    context copied, e.g. via contextvars.copy_context().run).
+    """
+    session = _current_session.get()
+    if session is None or not session.join_thread():
+        yield
+        return
+
+    profiler = cProfile.Profile() if _PER_THREAD_PROFILER else None
+    if profiler is not None:
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool is active; the thread still shows up in the stack samples
+            profiler = None
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        session.leave_thread(profiler)
+
+
+def _profiled(endpoint):
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        with profile_thread():
+            return endpoint(*args, **kwargs)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Route class joining sync endpoints, which FastAPI runs in its threadpool, to the profile of their request."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _profiled(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class RequestProfiler:
+    """Runs one request under cProfile plus a stack sampler and stores the results."""
+
+    def __init__(self):
+        self.profile_dir = Config.PROFILE_DIR
+        self.history = deque(maxlen=Config.PROFILE_HISTORY)
+        # cProfile hooks are per-interpreter state, so only one request is profiled at a time
+        self._lock = threading.Lock()
+        self.active: Optional[ProfilingSession] = None
+        self.in_flight = 0  # requests being served by this worker, updated on the event loop
+
+    def start(self) -> Optional[ProfilingSession]:
+        if not self._lock.acquire(blocking=False):
+            return None
+
+        session = ProfilingSession()
+        # Requests already in flight share the event loop (and, from 3.12, the profiler) with this one
+        session.overlapping_requests = self.in_flight - 1
+        self.active = session
+        session.sampler.start()
+        session.profiler.enable()
+        return session
+
+    def note_request(self):
+        if self.active is not None:
+            self.active.overlapping_requests += 1
+
+    def stop(self, session: ProfilingSession, method: str, path: str) -> str:
+        try:
+            self.active = None
+            session.stop()
+            duration = time.perf_counter() - session.start
+
+            os.makedirs(self.profile_dir, exist_ok=True)
+            profile_id = uuid.uuid4().hex
+            pstats_path = os.path.join(self.profile_dir, f"{profile_id}.pstats")
+            collapsed_path = os.path.join(self.profile_dir, f"{profile_id}.collapsed")
+            session.dump_stats(pstats_path)
+            session.sampler.write_collapsed(collapsed_path)
+
+            self.history.append({
+                "id": profile_id,
+                "method": method,
+                "path": path,
+                "duration_ms": round(duration * 1000, 2),
+                "overlapping_requests": session.overlapping_requests,
+                "created_at": datetime.now().isoformat(),
+                "pstats_file": pstats_path,
+                "collapsed_file": collapsed_path,
+            })
+            return profile_id
+        finally:
+            self._lock.release()
+
+    def get_slowest(self, limit: int = 10) -> List[Dict]:
+        return sorted(self.history, key=lambda record: record["duration_ms"], reverse=True)[:limit]
+
+
+request_profiler = RequestProfiler()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests that carry the profiling header, when enabled in config."""
+
+    def __init__(self, app):
+        self.app = app
+        self.header = Config.PROFILE_REQUEST_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not Config.PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        request_profiler.in_flight += 1
+        try:
+            await self._call(scope, receive, send)
+        finally:
+            request_profiler.in_flight -= 1
+
+    async def _call(self, scope, receive, send):
+        headers = dict(scope["headers"])
+        if headers.get(self.header, b"").lower() not in (b"1", b"true", b"yes"):
+            request_profiler.note_request()
+            await self.app(scope, receive, send)
+            return
+
+        session = request_profiler.start()
+        if session is None:
+            request_profiler.note_request()
+            await self.app(scope, receive, send)
+            return
+
+        state = {"stopped": False}
+
+        def finish():
+            state["stopped"] = True
+            return request_profiler.stop(session, scope["method"], scope["path"])
+
+        async def send_wrapper(message):
+            # The handler has finished once the response starts, so the profile id can go in the headers
+            if message["type"] == "http.response.start" and not state["stopped"]:
+                profile_id = finish()
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [
+                    (Config.PROFILE_ID_HEADER.lower().encode("latin-1"), profile_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        token = _current_session.set(session)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_session.reset(token)
+            if not state["stopped"]:
+                finish()
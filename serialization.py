@@ -0,0 +1,65 @@
+import importlib.util
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _negotiate(request: Request, columnar: bool) -> str:
+    output_format = request.query_params.get("format", "").lower()
+    if not output_format:
+        accept = request.headers.get("accept", "")
+        if MSGPACK_MEDIA_TYPE in accept or "application/x-msgpack" in accept:
+            output_format = "msgpack"
+        elif ARROW_MEDIA_TYPE in accept and columnar:
+            output_format = "arrow"
+        else:
+            output_format = "json"
+
+    if output_format == "msgpack" and importlib.util.find_spec("msgpack") is None:
+        raise HTTPException(status_code=406, detail="MessagePack support requires the msgpack package")
+    if output_format == "arrow":
+        if not columnar:
+            raise HTTPException(status_code=406, detail="Arrow encoding is only available for columnar endpoints")
+        if importlib.util.find_spec("pyarrow") is None:
+            raise HTTPException(status_code=406, detail="Arrow support requires the pyarrow package")
+    if output_format not in ("json", "msgpack", "arrow"):
+        raise HTTPException(status_code=406, detail=f"Unsupported response format: {output_format}")
+
+    return output_format
+
+
+def response_format(request: Request) -> str:
+    """Dependency choosing json or msgpack from the `format` query parameter or the Accept header."""
+    return _negotiate(request, columnar=False)
+
+
+def columnar_response_format(request: Request) -> str:
+    """Like `response_format`, but endpoints using it can also answer with an Arrow IPC stream."""
+    return _negotiate(request, columnar=True)
+
+
+def encode_response(payload: Dict, output_format: str = "json",
+                    columns: Optional[Dict[str, List[Any]]] = None) -> Response:
+    """Encodes a payload as JSON (orjson), MessagePack or an Arrow IPC stream of `columns`.
+
+    Returning the Response directly also skips FastAPI's jsonable_encoder pass over the payload.
+    """
+    if output_format == "msgpack":
+        import msgpack
+
+        return Response(content=msgpack.packb(payload, use_bin_type=True), media_type=MSGPACK_MEDIA_TYPE)
+
+    if output_format == "arrow":
+        import pyarrow as pa
+
+        table = pa.table(columns)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE)
+
+    return ORJSONResponse(payload)
@@ -0,0 +1,90 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from config import Config
+from database import get_engine
+
+# Startup timings and readiness, reported by the /ready endpoint
+_state = {
+    "ready": False,
+    "import_seconds": None,
+    "warmup_seconds": None,  # until ready: the database check
+    "preloaded": False,
+    "preload_seconds": None,  # heavy imports and model loading, after ready
+    "warmup_errors": {},
+}
+
+
+def record_import_time(seconds: float):
+    _state["import_seconds"] = round(seconds, 4)
+
+
+def _check_database() -> Optional[str]:
+    try:
+        with get_engine().connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def recheck_database():
+    """Retries the database check of a warm-up that failed to connect, clearing the error once it succeeds."""
+    if "database" not in _state["warmup_errors"]:
+        return
+
+    errors = dict(_state["warmup_errors"])
+    database_error = _check_database()
+    if database_error is None:
+        errors.pop("database")
+    else:
+        errors["database"] = database_error
+    _state["warmup_errors"] = errors
+
+
+def warm_up(predictor):
+    start = time.perf_counter()
+
+    # Readiness only depends on the database; the heavy preloading below happens after it
+    database_error = _check_database()
+    if database_error is not None:
+        _state["warmup_errors"] = {**_state["warmup_errors"], "database": database_error}
+    _state["warmup_seconds"] = round(time.perf_counter() - start, 4)
+    _state["ready"] = True
+    print(f"Ready after {_state['warmup_seconds']}s")
+
+    preload_start = time.perf_counter()
+    errors = {}
+    try:
+        # Pull in the heavy scientific stack before the first /train-model or /predict needs it
+        import pandas  # noqa: F401
+        import joblib  # noqa: F401
+        import sklearn.ensemble  # noqa: F401
+    except Exception as e:
+        errors["imports"] = str(e)
+
+    try:
+        predictor.load_model()
+    except Exception as e:
+        errors["model"] = str(e)
+
+    _state["preload_seconds"] = round(time.perf_counter() - preload_start, 4)
+    _state["warmup_errors"] = {**_state["warmup_errors"], **errors}
+    _state["preloaded"] = True
+    print(f"Preloading completed in {_state['preload_seconds']}s")
+
+
+def start_warm_up(predictor):
+    if not Config.WARMUP_ON_STARTUP:
+        _state["ready"] = True
+        return
+
+    # Warm up in the background so the worker can serve lightweight routes immediately
+    threading.Thread(target=warm_up, args=(predictor,), daemon=True).start()
+
+
+def get_startup_report() -> Dict:
+    return dict(_state)
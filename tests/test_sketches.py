@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from sketches import FixedWidthHistogram, TDigest
+
+QUANTILES = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99)
+
+
+def rank_errors(values, digest, quantiles=QUANTILES):
+    ordered = np.sort(values)
+    estimates = digest.quantile(quantiles)
+    ranks = np.searchsorted(ordered, estimates, side='right') / len(ordered)
+    return np.abs(ranks - np.asarray(quantiles))
+
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(7).lognormal(mean=4, sigma=1, size=50_000)
+
+
+def test_single_digest_rank_error(values):
+    digest = TDigest.from_values(values)
+
+    assert digest.count == len(values)
+    assert rank_errors(values, digest).max() < 0.005
+
+
+def test_merged_digests_rank_error(values):
+    # Same shape as the app: one serialized digest per bucket, merged per group at query time
+    merged = None
+    for chunk in np.array_split(values, 72):
+        digest = TDigest.from_dict(TDigest.from_values(chunk).to_dict())
+        if merged is None:
+            merged = digest
+        else:
+            merged.merge(digest)
+
+    assert merged.count == len(values)
+    assert rank_errors(values, merged).max() < 0.005
+
+
+def test_quantiles_are_exact_at_extremes(values):
+    digest = TDigest.from_values(values)
+
+    assert digest.quantile([0.0])[0] == pytest.approx(values.min())
+    assert digest.quantile([1.0])[0] == pytest.approx(values.max())
+
+
+def test_histogram_merge_matches_single_histogram(values):
+    halves = np.array_split(values, 2)
+    merged = FixedWidthHistogram.from_values(halves[0], 25)
+    merged.merge(FixedWidthHistogram.from_values(halves[1], 25))
+    expected = np.bincount(np.floor(values / 25).astype(int))
+
+    assert merged.counts.tolist() == expected.tolist()
+    assert sum(entry['count'] for entry in merged.bins()) == len(values)
+
+
+def test_histogram_rejects_different_bin_widths():
+    with pytest.raises(ValueError):
+        FixedWidthHistogram(25).merge(FixedWidthHistogram(10))
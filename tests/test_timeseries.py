@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from timeseries import BikeSharingTimeSeries
+
+
+def make_days(start, days, seed):
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64(start), np.datetime64(start) + days)
+    return dates, {metric: rng.integers(0, 9000, days) for metric in BikeSharingTimeSeries.METRICS}
+
+
+def naive_moving_average(values, window):
+    return np.array([
+        values[i + 1 - window:i + 1].mean() if i + 1 >= window else np.nan
+        for i in range(len(values))
+    ])
+
+
+def naive_yoy_delta(dates, values, lag_days):
+    by_date = dict(zip(dates.tolist(), values.tolist()))
+    lag = timedelta(days=lag_days)
+    return np.array([
+        value - by_date[day - lag] if day - lag in by_date else np.nan
+        for day, value in zip(dates.tolist(), values.tolist())
+    ])
+
+
+@pytest.fixture
+def series_data():
+    # Two years with a gap, so year-over-year lookups have to skip missing days
+    first_dates, first_values = make_days('2011-01-01', 400, seed=1)
+    second_dates, second_values = make_days('2012-02-10', 320, seed=2)
+    dates = np.concatenate([first_dates, second_dates])
+    values = {metric: np.concatenate([first_values[metric], second_values[metric]]) for metric in first_values}
+    return dates, values
+
+
+@pytest.mark.parametrize("chunks", [1, 3, 17])
+def test_appended_days_match_naive_recomputation(series_data, chunks):
+    dates, values = series_data
+    series = BikeSharingTimeSeries()
+    for positions in np.array_split(np.arange(len(dates)), chunks):
+        series.append_days(dates[positions], {metric: column[positions] for metric, column in values.items()})
+
+    for metric in series.METRICS:
+        np.testing.assert_array_equal(series.values[metric], values[metric])
+        for window in series.WINDOWS:
+            np.testing.assert_allclose(
+                series.rolling[(metric, window)], naive_moving_average(values[metric], window)
+            )
+        expected_delta = naive_yoy_delta(dates, values[metric], series.YOY_LAG_DAYS)
+        assert not np.isnan(expected_delta).all()
+        np.testing.assert_array_equal(series.yoy_delta[metric], expected_delta)
+
+
+def test_yoy_delta_compares_same_weekday(series_data):
+    dates, values = series_data
+    series = BikeSharingTimeSeries()
+    series.append_days(dates, values)
+
+    position = int(np.searchsorted(dates, np.datetime64('2012-01-05')))
+    previous = int(np.searchsorted(dates, np.datetime64('2011-01-06')))
+    assert dates[position].astype(date).weekday() == dates[previous].astype(date).weekday()
+    assert series.yoy_delta['cnt'][position] == values['cnt'][position] - values['cnt'][previous]
+
+
+def test_append_rejects_older_days(series_data):
+    dates, values = series_data
+    series = BikeSharingTimeSeries()
+    series.append_days(dates[10:], {metric: column[10:] for metric, column in values.items()})
+
+    with pytest.raises(ValueError):
+        series.append_days(dates[:10], {metric: column[:10] for metric, column in values.items()})
+
+
+def test_hour_of_week_baseline_matches_groupby():
+    rng = np.random.default_rng(3)
+    weekdays, hours = rng.integers(0, 7, 5000), rng.integers(0, 24, 5000)
+    values = {metric: rng.integers(0, 900, 5000).astype(float) for metric in BikeSharingTimeSeries.METRICS}
+    series = BikeSharingTimeSeries()
+    series.append_hours(weekdays[:2000], hours[:2000], {metric: column[:2000] for metric, column in values.items()})
+    series.append_hours(weekdays[2000:], hours[2000:], {metric: column[2000:] for metric, column in values.items()})
+
+    baseline = series.to_dict()['hour_of_week_baseline']
+    for weekday, hour, average in zip(baseline['weekday'], baseline['hr'], baseline['avg_cnt']):
+        in_bucket = (weekdays == weekday) & (hours == hour)
+        assert average == pytest.approx(round(values['cnt'][in_bucket].mean(), 2))
+
+
+def test_to_dict_filters_date_range(series_data):
+    dates, values = series_data
+    series = BikeSharingTimeSeries()
+    series.append_days(dates, values)
+
+    daily = series.to_dict(date(2011, 3, 1), date(2011, 3, 31))['daily']
+    assert daily['date'][0] == '2011-03-01' and daily['date'][-1] == '2011-03-31'
+    assert len(daily['cnt']) == 31
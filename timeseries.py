@@ -0,0 +1,196 @@
+import threading
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from database import DailyData, HourlyData
+
+
+class BikeSharingTimeSeries:
+    """Rolling-window, hour-of-week and year-over-year analytics kept in memory.
+
+    Daily series are stored as NumPy arrays together with their cumulative sums, so a moving
+    average over any window is a difference of two cumulative sums. New days are appended with
+    `refresh`, which only reads rows newer than the last loaded date and only computes the
+    window values for the appended tail.
+    """
+
+    METRICS = ('cnt', 'casual', 'registered')
+    WINDOWS = (7, 28)
+    YOY_LAG_DAYS = 364  # 52 weeks, so compared days fall on the same weekday
+    HOURS_PER_WEEK = 7 * 24
+
+    def __init__(self):
+        # Re-entrant because refresh() resets the series while holding the lock
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.dates = np.empty(0, dtype='datetime64[D]')
+            self.values = {metric: np.empty(0, dtype=np.int64) for metric in self.METRICS}
+            # cumsums[metric][i] is the sum of the first i values (a leading 0 keeps window maths branch-free)
+            self.cumsums = {metric: np.zeros(1, dtype=np.int64) for metric in self.METRICS}
+            self.rolling = {
+                (metric, window): np.empty(0) for metric in self.METRICS for window in self.WINDOWS
+            }
+            self.yoy_delta = {metric: np.empty(0) for metric in self.METRICS}
+
+            self.last_hour_date = None
+            self.hour_of_week_sums = {metric: np.zeros(self.HOURS_PER_WEEK) for metric in self.METRICS}
+            self.hour_of_week_counts = np.zeros(self.HOURS_PER_WEEK)
+
+            # (count, max instant, sum of cnt) of the rows loaded so far from each table
+            self.daily_fingerprint = (0, None, 0)
+            self.hourly_fingerprint = (0, None, 0)
+
+    def append_days(self, dates: np.ndarray, values: Dict[str, np.ndarray]):
+        if len(dates) == 0:
+            return
+        if len(self.dates) and dates[0] <= self.dates[-1]:
+            raise ValueError("Appended days must be newer than the loaded series")
+
+        start = len(self.dates)
+        self.dates = np.concatenate([self.dates, dates])
+        end = len(self.dates)
+        positions = np.arange(start, end)
+
+        for metric in self.METRICS:
+            new_values = values[metric].astype(np.int64)
+            self.values[metric] = np.concatenate([self.values[metric], new_values])
+            self.cumsums[metric] = np.concatenate([
+                self.cumsums[metric], self.cumsums[metric][-1] + np.cumsum(new_values)
+            ])
+            cumsum = self.cumsums[metric]
+
+            for window in self.WINDOWS:
+                lower = positions + 1 - window
+                valid = lower >= 0
+                moving_average = np.full(len(positions), np.nan)
+                moving_average[valid] = (
+                    cumsum[positions[valid] + 1] - cumsum[lower[valid]]
+                ) / window
+                self.rolling[(metric, window)] = np.concatenate(
+                    [self.rolling[(metric, window)], moving_average]
+                )
+
+            # Look up the same weekday one year earlier; gaps in the series yield NaN
+            previous_dates = self.dates[start:end] - np.timedelta64(self.YOY_LAG_DAYS, 'D')
+            previous_positions = np.searchsorted(self.dates, previous_dates)
+            in_range = previous_positions < end
+            found = np.zeros(len(positions), dtype=bool)
+            found[in_range] = self.dates[previous_positions[in_range]] == previous_dates[in_range]
+            delta = np.full(len(positions), np.nan)
+            delta[found] = new_values[found] - self.values[metric][previous_positions[found]]
+            self.yoy_delta[metric] = np.concatenate([self.yoy_delta[metric], delta])
+
+    def append_hours(self, weekdays: np.ndarray, hours: np.ndarray, values: Dict[str, np.ndarray]):
+        buckets = weekdays.astype(np.int64) * 24 + hours.astype(np.int64)
+        self.hour_of_week_counts += np.bincount(buckets, minlength=self.HOURS_PER_WEEK)
+        for metric in self.METRICS:
+            self.hour_of_week_sums[metric] += np.bincount(
+                buckets, weights=values[metric], minlength=self.HOURS_PER_WEEK
+            )
+
+    @staticmethod
+    def _fingerprint(db: Session, table, last_date) -> Tuple:
+        if last_date is None:
+            return 0, None, 0
+        count, max_instant, total = db.query(
+            func.count(table.instant), func.max(table.instant), func.sum(table.cnt)
+        ).filter(table.dteday <= last_date).first()
+        return count, max_instant, int(total or 0)
+
+    @staticmethod
+    def _extend_fingerprint(fingerprint: Tuple, instants, counts) -> Tuple:
+        count, max_instant, total = fingerprint
+        return count + len(instants), max(instants + (max_instant or 0,)), total + int(sum(counts))
+
+    def refresh(self, db: Session):
+        with self._lock:
+            last_date = self.dates[-1].astype(date) if len(self.dates) else None
+
+            # Only appended days can be loaded incrementally. /load-data replaces the tables and
+            # only resets the series of the worker that served it, so every worker compares
+            # the rows it has already loaded against the database and starts over on any change.
+            if (self._fingerprint(db, DailyData, last_date) != self.daily_fingerprint or
+                    self._fingerprint(db, HourlyData, self.last_hour_date) != self.hourly_fingerprint):
+                self.reset()
+                last_date = None
+
+            query = db.query(
+                DailyData.dteday, DailyData.cnt, DailyData.casual, DailyData.registered, DailyData.instant
+            )
+            if last_date is not None:
+                query = query.filter(DailyData.dteday > last_date)
+            rows = query.order_by(DailyData.dteday).all()
+            if rows:
+                columns = list(zip(*rows))
+                self.append_days(
+                    np.array(columns[0], dtype='datetime64[D]'),
+                    {metric: np.array(column) for metric, column in zip(self.METRICS, columns[1:4])}
+                )
+                self.daily_fingerprint = self._extend_fingerprint(self.daily_fingerprint, columns[4], columns[1])
+
+            query = db.query(
+                HourlyData.dteday, HourlyData.weekday, HourlyData.hr,
+                HourlyData.cnt, HourlyData.casual, HourlyData.registered, HourlyData.instant
+            )
+            if self.last_hour_date is not None:
+                query = query.filter(HourlyData.dteday > self.last_hour_date)
+            rows = query.all()
+            if rows:
+                columns = list(zip(*rows))
+                self.append_hours(
+                    np.array(columns[1]),
+                    np.array(columns[2]),
+                    {metric: np.array(column, dtype=float) for metric, column in zip(self.METRICS, columns[3:6])}
+                )
+                self.last_hour_date = max(columns[0])
+                self.hourly_fingerprint = self._extend_fingerprint(self.hourly_fingerprint, columns[6], columns[3])
+
+    @staticmethod
+    def _to_list(values: np.ndarray):
+        return [None if np.isnan(value) else round(float(value), 2) for value in values]
+
+    def to_dict(self, start_date: Optional[date] = None, end_date: Optional[date] = None) -> Dict:
+        with self._lock:
+            return self._to_dict(start_date, end_date)
+
+    def _to_dict(self, start_date: Optional[date], end_date: Optional[date]) -> Dict:
+        lower = 0 if start_date is None else np.searchsorted(self.dates, np.datetime64(start_date, 'D'))
+        upper = len(self.dates) if end_date is None else np.searchsorted(
+            self.dates, np.datetime64(end_date, 'D'), side='right'
+        )
+
+        daily = {'date': self.dates[lower:upper].astype(str).tolist()}
+        for metric in self.METRICS:
+            daily[metric] = self.values[metric][lower:upper].tolist()
+            for window in self.WINDOWS:
+                daily[f'{metric}_ma_{window}'] = self._to_list(self.rolling[(metric, window)][lower:upper])
+            daily[f'{metric}_yoy_delta'] = self._to_list(self.yoy_delta[metric][lower:upper])
+
+        counts = np.where(self.hour_of_week_counts > 0, self.hour_of_week_counts, np.nan)
+        hour_of_week = {
+            'weekday': (np.arange(self.HOURS_PER_WEEK) // 24).tolist(),
+            'hr': (np.arange(self.HOURS_PER_WEEK) % 24).tolist(),
+        }
+        for metric in self.METRICS:
+            hour_of_week[f'avg_{metric}'] = self._to_list(self.hour_of_week_sums[metric] / counts)
+
+        return {
+            'daily': daily,
+            'hour_of_week_baseline': hour_of_week
+        }
+
+    def get_timeseries(self, db: Session, start_date: Optional[date] = None,
+                       end_date: Optional[date] = None) -> Dict:
+        try:
+            self.refresh(db)
+            return self.to_dict(start_date, end_date)
+        except Exception as e:
+            print(f"Error getting time series analytics: {e}")
+            return {}